@@ -0,0 +1,77 @@
+import io
+import os
+import threading
+from typing import Optional
+from config import MEMORY_BUFFER_LIMIT
+from utils import format_file_size, logger
+
+class MemoryBudget:
+    def __init__(self, limit: int = MEMORY_BUFFER_LIMIT):
+        self.limit = limit
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def fits(self, size: int) -> bool:
+        return size <= self.limit
+
+    def acquire(self, size: int) -> None:
+        with self.condition:
+            while self.used + size > self.limit:
+                self.condition.wait()
+            self.used += size
+
+    def release(self, size: int) -> None:
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+class AudioBuffer:
+    def __init__(self, data: bytes, filename: str, budget: Optional[MemoryBudget] = None):
+        self.data = data
+        self.name = filename
+        self.size = len(data)
+        self.budget = budget
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+
+    def open(self) -> io.BytesIO:
+        return io.BytesIO(self.data)
+
+    def update(self, data: bytes) -> None:
+        if self.budget is not None:
+            self.budget.release(self.size - len(data))
+        self.data = data
+        self.size = len(data)
+
+    def release(self) -> None:
+        if self.budget is not None:
+            self.budget.release(self.size)
+            self.budget = None
+        self.data = b''
+
+    def __getstate__(self):
+        state = {'data': self.data, 'name': self.name, 'size': self.size, 'budget': None}
+        if self.budget is not None:
+            self.budget.release(self.size)
+            self.budget = None
+        return state
+
+    def __repr__(self) -> str:
+        return f"<AudioBuffer {self.name} {format_file_size(self.size)}>"
+
+def load_audio_buffer(file_path: str, budget: MemoryBudget) -> Optional[AudioBuffer]:
+    size = os.path.getsize(file_path)
+    if not budget.fits(size):
+        logger.info(f"{os.path.basename(file_path)} exceeds the memory buffer limit, keeping it on disk")
+        return None
+    budget.acquire(size)
+    try:
+        with open(file_path, 'rb') as audio_file:
+            data = audio_file.read()
+        os.remove(file_path)
+    except Exception:
+        budget.release(size)
+        raise
+    return AudioBuffer(data, os.path.basename(file_path), budget)
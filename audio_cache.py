@@ -0,0 +1,205 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config import AUDIO_CACHE_PATH, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_MIN_AGE, SQLITE_JOURNAL_MODE
+from utils import ensure_download_directory, format_file_size, logger
+
+TEMP_SUFFIX = '.tmp'
+INDEX_NAME = 'index.sqlite3'
+
+class AudioCache:
+    def __init__(self, directory: str = AUDIO_CACHE_PATH, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 min_age: float = AUDIO_CACHE_MIN_AGE):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            ensure_download_directory(self.directory)
+            self.conn = sqlite3.connect(
+                os.path.join(self.directory, INDEX_NAME), timeout=30, isolation_level=None, check_same_thread=False
+            )
+            with self.lock:
+                self.conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " key TEXT PRIMARY KEY,"
+                    " path TEXT NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " last_used REAL NOT NULL)"
+                )
+            self.scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(track_id: str, variant: str) -> str:
+        return f"{track_id}-{variant}"
+
+    def owns(self, file_path: str) -> bool:
+        return os.path.dirname(os.path.abspath(file_path)) == self.directory
+
+    def scan(self) -> None:
+        now = time.time()
+        found = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(INDEX_NAME) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            if name.endswith(TEMP_SUFFIX):
+                if now - stat.st_mtime >= self.min_age:
+                    os.remove(path)
+                continue
+            found[path] = (os.path.splitext(name)[0], stat.st_size, stat.st_mtime)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, path in self.conn.execute("SELECT key, path FROM entries").fetchall():
+                    if found.pop(path, None) is None:
+                        self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, path, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, path, size, mtime) for path, (key, size, mtime) in found.items()]
+                )
+                evicted = self._evict()
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        self._remove(evicted)
+        stats = self.stats()
+        logger.info(
+            f"Audio cache loaded {stats['files']} files "
+            f"({format_file_size(stats['bytes'])} of {format_file_size(self.max_bytes)})"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and not os.path.exists(row[0]):
+                self.conn.execute("DELETE FROM entries WHERE key = ? AND path = ?", (key, row[0]))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        try:
+            os.utime(row[0])
+        except OSError:
+            pass
+        return row[0]
+
+    def contains(self, key: str) -> bool:
+        if not self.enabled:
+            return False
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def store(self, key: str, source_path: str) -> str:
+        if not self.enabled:
+            return source_path
+        extension = os.path.splitext(source_path)[1]
+        final_path = os.path.join(self.directory, f"{key}{extension}")
+        temp_path = f"{final_path}.{os.getpid()}{TEMP_SUFFIX}"
+        try:
+            try:
+                os.replace(source_path, temp_path)
+            except OSError:
+                shutil.copyfile(source_path, temp_path)
+                os.remove(source_path)
+            os.replace(temp_path, final_path)
+        except OSError as e:
+            logger.error(f"Could not store {key} in audio cache: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return source_path
+        self._add(key, final_path)
+        return final_path
+
+    def store_bytes(self, key: str, data: bytes, extension: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        final_path = os.path.join(self.directory, f"{key}{extension}")
+        temp_path = f"{final_path}.{os.getpid()}{TEMP_SUFFIX}"
+        try:
+            with open(temp_path, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, final_path)
+        except OSError as e:
+            logger.error(f"Could not store {key} in audio cache: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+        self._add(key, final_path)
+        return final_path
+
+    def _add(self, key: str, final_path: str) -> None:
+        size = os.path.getsize(final_path)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, path, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, final_path, size, time.time())
+                )
+                evicted = self._evict()
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        if row and row[0] != final_path:
+            evicted.append((key, row[0]))
+        self._remove(evicted)
+
+    def _evict(self) -> List[Tuple[str, str]]:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = []
+        if total <= self.max_bytes:
+            return evicted
+        rows = self.conn.execute(
+            "SELECT key, path, size FROM entries WHERE last_used <= ? ORDER BY last_used",
+            (time.time() - self.min_age,)
+        ).fetchall()
+        for key, path, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            evicted.append((key, path))
+            total -= size
+        return evicted
+
+    def _remove(self, evicted: List[Tuple[str, str]]) -> None:
+        for key, path in evicted:
+            try:
+                os.remove(path)
+                logger.info(f"Evicted {key} from audio cache")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict {key} from audio cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        files, total = 0, 0
+        if self.enabled:
+            with self.lock:
+                files, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            'files': files,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
\ No newline at end of file
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the Spotify Telegram Bot.
+Drives SpotifyBot end to end against a stub Spotify API, a local HTTP server
+serving synthetic audio to yt-dlp and a fake Telegram Bot API, then reports
+latency percentiles, throughput and CPU/RSS usage per job.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for the bot pipeline")
+    parser.add_argument('--tracks', type=int, default=20, help="number of distinct tracks")
+    parser.add_argument('--requests', type=int, default=0, help="total requests, repeats tracks when above --tracks")
+    parser.add_argument('--concurrency', type=int, default=4, help="requests in flight at once")
+    parser.add_argument('--users', type=int, default=4, help="distinct Telegram users issuing requests")
+    parser.add_argument('--workers', type=int, default=4, help="download worker pool size")
+    parser.add_argument('--duration', type=int, default=180, help="track length in seconds")
+    parser.add_argument('--audio-kb', type=int, default=1024, help="size of the synthetic audio file")
+    parser.add_argument('--upload-latency', type=float, default=0.05, help="seconds the fake Bot API takes per upload")
+    parser.add_argument('--pipeline-mode', default='disk', choices=('disk', 'memory'))
+    parser.add_argument('--audio-cache', action='store_true', help="keep the audio cache enabled")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH")
+    parser.add_argument('--verbose', action='store_true', help="show bot logging")
+    return parser.parse_args()
+
+def box(kind, payload):
+    """Build an MP4 box."""
+    return struct.pack('>I', 8 + len(payload)) + kind + payload
+
+def make_m4a(seconds, size):
+    """Build a minimal M4A file that mutagen can read and tag."""
+    ftyp = box(b'ftyp', b'M4A \x00\x00\x02\x00M4A mp42isom')
+    mvhd = box(b'mvhd', b'\x00' * 4 + struct.pack('>IIII', 0, 0, 1000, seconds * 1000) + b'\x00\x01\x00\x00\x01\x00' + b'\x00' * 10
+               + b'\x00\x01\x00\x00' + b'\x00' * 12 + b'\x00\x01\x00\x00' + b'\x00' * 12 + b'\x40\x00\x00\x00' + b'\x00' * 24 + b'\x00\x00\x00\x02')
+    mdhd = box(b'mdhd', b'\x00' * 4 + struct.pack('>IIII', 0, 0, 44100, seconds * 44100) + b'\x55\xc4\x00\x00')
+    hdlr = box(b'hdlr', b'\x00' * 8 + b'soun' + b'\x00' * 13)
+    esds = box(b'esds', b'\x00' * 4 + b'\x03\x19\x00\x00\x00\x04\x11\x40\x15\x00\x00\x00\x00\x01\xf4\x00\x00\x01\xf4\x00\x05\x02\x12\x10\x06\x01\x02')
+    mp4a = box(b'mp4a', b'\x00' * 6 + b'\x00\x01' + b'\x00' * 8 + b'\x00\x02\x00\x10' + b'\x00' * 4 + struct.pack('>I', 44100 << 16) + esds)
+    stsd = box(b'stsd', b'\x00' * 4 + struct.pack('>I', 1) + mp4a)
+    trak = box(b'trak', box(b'mdia', mdhd + hdlr + box(b'minf', box(b'stbl', stsd))))
+    moov = box(b'moov', mvhd + trak)
+    return ftyp + moov + box(b'mdat', b'\x00' * size)
+
+class StubSpotify:
+    """Answers the spotipy calls the downloader makes with generated tracks."""
+
+    def __init__(self, duration_ms):
+        self.duration_ms = duration_ms
+        self.calls = 0
+
+    def make_track(self, track_id):
+        return {
+            'id': track_id,
+            'name': f'Benchmark Song {track_id}',
+            'artists': [{'name': 'Benchmark Artist'}],
+            'album': {'name': 'Benchmark Album', 'images': [], 'release_date': '2024-01-01'},
+            'duration_ms': self.duration_ms,
+            'popularity': 50,
+            'type': 'track',
+        }
+
+    def track(self, track_id):
+        self.calls += 1
+        return self.make_track(track_id)
+
+    def tracks(self, track_ids):
+        self.calls += 1
+        return {'tracks': [self.make_track(track_id) for track_id in track_ids]}
+
+def start_server(handler):
+    """Serve a request handler from a background thread on a free local port."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_audio_handler(audio):
+    """Serve the same synthetic audio file for every path, like a media CDN."""
+    class AudioHandler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'audio/mp4')
+            self.send_header('Content-Length', str(len(audio)))
+            self.end_headers()
+
+        def do_GET(self):
+            self.do_HEAD()
+            try:
+                self.wfile.write(audio)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return AudioHandler
+
+class FakeBotApi:
+    """Minimal Telegram Bot API that accepts uploads and records deliveries."""
+
+    def __init__(self, upload_latency):
+        self.upload_latency = upload_latency
+        self.lock = threading.Lock()
+        self.message_id = 0
+        self.delivered = {}
+        self.uploaded_bytes = 0
+        self.calls = {}
+
+    def parse_fields(self, headers, body):
+        content_type = headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            return {
+                name.decode(): value.decode(errors='replace')
+                for name, value in re.findall(rb'name="([^"]+)"\r\n\r\n([^\r]*)\r\n', body)
+            }
+        if content_type.startswith('application/json'):
+            return json.loads(body or b'{}')
+        return {name: values[0] for name, values in parse_qs(body.decode()).items()}
+
+    def handle(self, method, fields, size):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.message_id += 1
+            message_id = self.message_id
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Benchmark', 'username': 'benchmark_bot'}
+        chat_id = int(fields.get('chat_id', 0))
+        message = {
+            'message_id': int(fields.get('message_id', message_id)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': fields.get('text', ''),
+        }
+        if method == 'sendAudio':
+            time.sleep(self.upload_latency)
+            with self.lock:
+                self.delivered[chat_id] = time.perf_counter()
+                self.uploaded_bytes += size
+            message['audio'] = {
+                'file_id': f'benchmark-{message_id}',
+                'file_unique_id': f'benchmark-unique-{message_id}',
+                'duration': int(fields.get('duration', 0)),
+            }
+        return message
+
+    def make_handler(self):
+        api = self
+
+        class BotApiHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                result = api.handle(method, api.parse_fields(self.headers, body), len(body))
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return BotApiHandler
+
+def current_rss():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def cpu_seconds():
+    """Return CPU time used by this process and its children."""
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(item.ru_utime + item.ru_stime for item in usage)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+async def run_benchmark(args, audio_server, bot_api_server, bot_api):
+    """Send every request through SpotifyBot and collect per-job latencies."""
+    from telegram import Bot, Update
+    from bot import SpotifyBot
+
+    bot = SpotifyBot()
+    bot.downloader.spotify = StubSpotify(args.duration * 1000)
+    audio_url = f"http://127.0.0.1:{audio_server.server_port}/audio"
+    bot.downloader.search_youtube = lambda artist, title, duration_ms=None: f"{audio_url}/{abs(hash(title))}.m4a"
+    telegram_bot = Bot(args.token, base_url=f"http://127.0.0.1:{bot_api_server.server_port}/bot")
+    await telegram_bot.initialize()
+    await bot.post_init(types.SimpleNamespace(bot=telegram_bot))
+
+    total = args.requests or args.tracks
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def request(index):
+        chat_id = 1000 + index
+        user_id = index % args.users + 1
+        update = Update.de_json({
+            'update_id': index + 1,
+            'message': {
+                'message_id': index + 1,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'User {user_id}'},
+                'text': f"https://open.spotify.com/track/bench{index % args.tracks:05d}",
+            },
+        }, telegram_bot)
+        context = types.SimpleNamespace(bot=telegram_bot, args=None)
+        async with semaphore:
+            started = time.perf_counter()
+            await bot.process_spotify_url(update, context, update.message.text)
+            while chat_id not in bot_api.delivered:
+                stats = await asyncio.to_thread(bot.job_queue.stats)
+                if not stats.get('queued') and not stats.get('running'):
+                    break
+                await asyncio.sleep(0.01)
+            if chat_id in bot_api.delivered:
+                latencies.append(bot_api.delivered[chat_id] - started)
+
+    rss_before = current_rss()
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    await asyncio.gather(*(request(index) for index in range(total)))
+    wall = time.perf_counter() - started
+    cpu_used = cpu_seconds() - cpu_before
+    rss_after = current_rss()
+
+    await bot.shutdown(None)
+    await telegram_bot.shutdown()
+
+    succeeded = len(latencies)
+    return {
+        'requests': total,
+        'succeeded': succeeded,
+        'failed': total - succeeded,
+        'concurrency': args.concurrency,
+        'workers': args.workers,
+        'pipeline_mode': args.pipeline_mode,
+        'wall_seconds': round(wall, 3),
+        'tracks_per_minute': round(succeeded / wall * 60, 1) if wall else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'latency_p90_ms': round(percentile(latencies, 0.90) * 1000, 1),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'latency_max_ms': round(max(latencies, default=0) * 1000, 1),
+        'cpu_ms_per_job': round(cpu_used / total * 1000, 1) if total else 0.0,
+        'rss_mb': round(rss_after / 1024 / 1024, 1),
+        'rss_growth_kb_per_job': round((rss_after - rss_before) / total / 1024, 1) if total else 0.0,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'uploaded_mb': round(bot_api.uploaded_bytes / 1024 / 1024, 1),
+        'spotify_calls': bot.downloader.spotify.calls,
+        'bot_api_calls': dict(bot_api.calls),
+    }
+
+def print_report(results):
+    """Print benchmark results for humans."""
+    print("📊 Benchmark results")
+    print(f"   Requests:      {results['succeeded']}/{results['requests']} succeeded "
+          f"(concurrency {results['concurrency']}, {results['workers']} workers, {results['pipeline_mode']} pipeline)")
+    print(f"   Throughput:    {results['tracks_per_minute']} tracks/minute in {results['wall_seconds']}s")
+    print(f"   Latency:       p50 {results['latency_p50_ms']}ms, p90 {results['latency_p90_ms']}ms, "
+          f"p99 {results['latency_p99_ms']}ms, max {results['latency_max_ms']}ms")
+    print(f"   CPU:           {results['cpu_ms_per_job']}ms per job")
+    print(f"   Memory:        {results['rss_mb']}MB RSS ({results['rss_growth_kb_per_job']}KB growth per job, "
+          f"peak {results['peak_rss_mb']}MB)")
+    print(f"   Uploaded:      {results['uploaded_mb']}MB, Spotify calls: {results['spotify_calls']}")
+    if results['failed']:
+        print(f"❌ {results['failed']} requests failed")
+
+def main():
+    """Run the benchmark and report the results."""
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='spotify-bot-benchmark-')
+    args.token = '123456:benchmark'
+    os.environ.update({
+        'TELEGRAM_TOKEN': args.token,
+        'SPOTIPY_CLIENT_ID': 'benchmark',
+        'SPOTIPY_CLIENT_SECRET': 'benchmark',
+        'DOWNLOAD_PATH': os.path.join(work_dir, 'downloads'),
+        'CACHE_PATH': os.path.join(work_dir, 'cache'),
+        'MEMORY_SCRATCH_PATH': os.path.join(work_dir, 'scratch'),
+        'OUTPUT_FORMAT': 'auto',
+        'PIPELINE_MODE': args.pipeline_mode,
+        'AUDIO_CACHE_MAX_MB': os.environ.get('AUDIO_CACHE_MAX_MB', '2048') if args.audio_cache else '0',
+        'WORKER_POOL_SIZE': str(args.workers),
+        'MAX_CONCURRENT_DOWNLOADS': str(args.workers),
+        'WORKER_POLL_INTERVAL': '0.05',
+        'WARM_UP': 'false',
+        'PREFETCH': 'false',
+        'SPOTIFY_RATE_LIMIT': os.environ.get('SPOTIFY_RATE_LIMIT', '0'),
+        'YOUTUBE_RATE_LIMIT': os.environ.get('YOUTUBE_RATE_LIMIT', '0'),
+        'TELEGRAM_RATE_LIMIT': os.environ.get('TELEGRAM_RATE_LIMIT', '0'),
+    })
+    os.environ.pop('METRICS_PORT', None)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    audio_server = start_server(make_audio_handler(make_m4a(args.duration, args.audio_kb * 1024)))
+    bot_api = FakeBotApi(args.upload_latency)
+    bot_api_server = start_server(bot_api.make_handler())
+    try:
+        results = asyncio.run(run_benchmark(args, audio_server, bot_api_server, bot_api))
+    finally:
+        audio_server.shutdown()
+        bot_api_server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+    return 0 if not results['failed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,14 +1,39 @@
+import time
+STARTUP_STARTED = time.perf_counter()
 import asyncio
+import hashlib
 import logging
-import os
-from telegram import Update
+import signal
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from telegram import Bot, InlineQueryResultCachedAudio, InlineQueryResultsButton, Update
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler, filters, ContextTypes
+    Application, CommandHandler, InlineQueryHandler, MessageHandler, filters, ContextTypes
 )
 from telegram.constants import ParseMode
-from config import TELEGRAM_TOKEN, MAX_FILE_SIZE, validate_config
-from spotify_downloader import SpotifyDownloader
-from utils import is_valid_spotify_url, format_file_size, logger
+from telegram.error import BadRequest
+from config import (
+    TELEGRAM_TOKEN, MAX_FILE_SIZE, AUDIO_BITRATES, COLLECTION_PARALLELISM, WARM_UP, RUN_MODE,
+    DOWNLOAD_PATH, MEMORY_SCRATCH_PATH, AUDIO_CACHE_PATH, CACHE_CHAT_ID, INLINE_RESULTS_LIMIT, INLINE_CACHE_TIME,
+    JOB_LEASE_SECONDS, PREFETCH, WORKER_MAX_JOBS, validate_config
+)
+from worker_pool import WorkerPool
+from scheduler import JobScheduler
+from file_id_cache import FileIdCache
+from single_flight import SingleFlight
+from job_queue import JobQueue
+from status_reporter import StatusReporter
+import metrics
+import rate_governor
+from rate_governor import CircuitOpenError
+from utils import (
+    extract_spotify_id, find_spotify_links, is_spotify_short_link, make_spotify_url, format_file_size,
+    estimate_audio_size, logger
+)
+
+INLINE_SEARCH_PREFIX = 'search-'
+MAX_INLINE_SEARCHES = 1000
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -17,13 +42,135 @@ logging.basicConfig(
 
 class SpotifyBot:
     def __init__(self):
-        self.downloader = SpotifyDownloader()
-        self.active_downloads = {}
+        self._downloader = None
+        self.downloader_lock = threading.Lock()
+        self.pool = WorkerPool(lambda: self.downloader)
+        self.scheduler = JobScheduler()
+        self.file_ids = FileIdCache()
+        self.inflight = SingleFlight(cleanup=lambda result: self.downloader.cleanup_file(result[0]))
+        self.job_queue = JobQueue()
+        self.progress_watchers = {}
+        self.startup_times = {}
+        self.warm_up_task = None
+        self.worker = None
+        self.janitor = None
+        self.prefetcher = None
+        self.background_tasks = []
+        self.inline_fetches = {}
+        self.inline_searches: 'OrderedDict[str, str]' = OrderedDict()
+
+    @property
+    def downloader(self):
+        if self._downloader is None:
+            with self.downloader_lock:
+                if self._downloader is None:
+                    started = time.perf_counter()
+                    from spotify_downloader import SpotifyDownloader
+                    self._downloader = SpotifyDownloader()
+                    logger.info(f"Loaded downloader in {time.perf_counter() - started:.2f}s")
+        return self._downloader
+
+    async def load_downloader(self):
+        if self._downloader is None:
+            await asyncio.to_thread(lambda: self.downloader)
+        return self._downloader
+
+    async def post_init(self, application: Application):
+        self.startup_times['ready'] = time.perf_counter() - STARTUP_STARTED
+        logger.info(
+            f"Bot ready in {self.startup_times['ready']:.2f}s "
+            f"(imports {self.startup_times.get('imports', 0):.2f}s, setup {self.startup_times['ready'] - self.startup_times.get('imports', 0):.2f}s)"
+        )
+        if RUN_MODE == 'all':
+            self.start_worker(application.bot)
+        if WARM_UP and RUN_MODE != 'ingest':
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+
+    def start_worker(self, telegram_bot: Bot) -> asyncio.Task:
+        from queue_worker import QueueWorker
+        from disk_janitor import DiskJanitor
+        self.worker = QueueWorker(
+            self, self.job_queue, telegram_bot, concurrency=0 if RUN_MODE == 'all' else WORKER_MAX_JOBS
+        )
+        self.janitor = DiskJanitor(
+            {'downloads': DOWNLOAD_PATH, 'scratch': MEMORY_SCRATCH_PATH, 'audio_cache': AUDIO_CACHE_PATH},
+            sweep=('downloads', 'scratch')
+        )
+        self.background_tasks = [asyncio.create_task(self.worker.run()), asyncio.create_task(self.janitor.run())]
+        if PREFETCH:
+            from prefetcher import Prefetcher
+            self.prefetcher = Prefetcher(self)
+            self.background_tasks.append(asyncio.create_task(self.prefetcher.run()))
+        return self.background_tasks[0]
+
+    async def warm_up(self):
+        started = time.perf_counter()
+        try:
+            downloader = await self.load_downloader()
+            await asyncio.gather(asyncio.to_thread(downloader.warm_up), *self.pool.warm_up())
+            self.startup_times['warm_up'] = time.perf_counter() - started
+            logger.info(f"Warm-up finished in {self.startup_times['warm_up']:.2f}s")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    def register_metrics(self):
+        metrics.register_callback('spotify_bot_cache_lookups_total', 'Cache lookups by cache and result', self.collect_cache_lookups, kind='counter')
+        metrics.register_callback('spotify_bot_scheduler_jobs', 'Download jobs by scheduler state', self.collect_scheduler_stats)
+        metrics.register_callback(
+            'spotify_bot_audio_cache_bytes', 'Bytes held by the audio cache',
+            lambda: {(): self._downloader.audio_cache.stats()['bytes']} if self._downloader else {}
+        )
+        metrics.register_callback(
+            'spotify_bot_disk_bytes', 'Bytes on disk by directory, as of the last sweep',
+            lambda: {(('directory', name),): total for name, (files, total) in self.janitor.usage.items()} if self.janitor else {}
+        )
+        metrics.register_callback(
+            'spotify_bot_jobs', 'Journaled jobs by state',
+            lambda: {(('state', state),): count for state, count in self.job_queue.stats().items()}
+        )
+        metrics.register_callback(
+            'spotify_bot_upstream_rate', 'Current request rate allowed per upstream',
+            lambda: {(('upstream', name),): state['rate'] for name, state in rate_governor.stats().items()}
+        )
+        metrics.register_callback(
+            'spotify_bot_circuit_open', 'Whether the circuit breaker for an upstream is open',
+            lambda: {(('upstream', name),): state['open'] for name, state in rate_governor.stats().items()}
+        )
+        metrics.register_callback(
+            'spotify_bot_startup_seconds', 'Time spent in each startup phase',
+            lambda: {(('phase', phase),): seconds for phase, seconds in self.startup_times.items()}
+        )
+
+    def collect_cache_lookups(self):
+        caches = {'file_id': self.file_ids.stats()}
+        downloader = self._downloader
+        if downloader is not None:
+            caches['audio'] = downloader.audio_cache.stats()
+            caches['cover_art'] = {'hits': downloader.cover_art.hits, 'misses': downloader.cover_art.misses}
+            for source, counters in downloader.metadata_cache.stats().items():
+                caches[f'metadata_{source}'] = {
+                    'hits': counters.get('memory_hits', 0) + counters.get('store_hits', 0),
+                    'misses': counters.get('misses', 0),
+                }
+        lookups = {}
+        for name, stats in caches.items():
+            lookups[(('cache', name), ('result', 'hit'))] = stats['hits']
+            lookups[(('cache', name), ('result', 'miss'))] = stats['misses']
+        return lookups
+
+    def collect_scheduler_stats(self):
+        stats = self.scheduler.stats()
+        return {(('state', 'running'),): stats['running'], (('state', 'queued'),): stats['queued']}
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if context.args and context.args[0].startswith(INLINE_SEARCH_PREFIX):
+            query = self.inline_searches.get(context.args[0][len(INLINE_SEARCH_PREFIX):])
+            if query:
+                await self.download_search(update, context, query)
+                return
         welcome_message = (
             "🎵 *Welcome to Spotify Downloader Bot!*\n\n"
-            "Send me a Spotify track link or use `/song <spotify_url>`."
+            "Send me a Spotify track, album or playlist link or use `/song <spotify_url>`."
         )
         await update.message.reply_text(welcome_message, parse_mode=ParseMode.MARKDOWN)
 
@@ -33,7 +180,8 @@ class SpotifyBot:
             "`/start` - Welcome message\n"
             "`/help` - Show help\n"
             "`/song <url>` - Download a song from Spotify URL\n\n"
-            "Send a Spotify track URL to download the song."
+            "Send a Spotify track URL to download the song, or an album/playlist URL to download all of its tracks.\n"
+            "You can paste several links in one message and they will be downloaded together."
         )
         await update.message.reply_text(help_message, parse_mode=ParseMode.MARKDOWN)
 
@@ -44,12 +192,12 @@ class SpotifyBot:
                 parse_mode=ParseMode.MARKDOWN
             )
             return
-        spotify_url = context.args[0]
+        spotify_url = ' '.join(context.args)
         await self.process_spotify_url(update, context, spotify_url)
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         message_text = update.message.text.strip()
-        if 'spotify.com' in message_text:
+        if find_spotify_links(message_text) or 'spotify.com' in message_text or 'spotify.link' in message_text:
             await self.process_spotify_url(update, context, message_text)
         else:
             await update.message.reply_text(
@@ -59,83 +207,398 @@ class SpotifyBot:
 
     async def process_spotify_url(self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str):
         user_id = update.effective_user.id
-        if user_id in self.active_downloads:
+        links = await self.resolve_spotify_links(find_spotify_links(url))
+        if not links:
             await update.message.reply_text(
-                "⏳ You already have a download in progress. Please wait."
+                "❌ Invalid Spotify URL. Please provide a valid Spotify track, album or playlist link."
             )
             return
-        if not is_valid_spotify_url(url):
-            await update.message.reply_text(
-                "❌ Invalid Spotify URL. Please provide a valid Spotify track link."
-            )
-            return
-        self.active_downloads[user_id] = True
         try:
             status_message = await update.message.reply_text(
                 "🔄 *Processing your request...*\nGetting track information...",
                 parse_mode=ParseMode.MARKDOWN
             )
-            await self.download_and_send(update, context, url, status_message)
+            if len(links) > 1:
+                logger.info(f"Batching {len(links)} links from user {user_id}")
+            await self.enqueue_download(update, context, ' '.join(links), status_message)
         except Exception as e:
             logger.error(f"Error processing URL for user {user_id}: {e}")
             await update.message.reply_text(
                 "❌ An error occurred while processing your request."
             )
-        finally:
-            self.active_downloads.pop(user_id, None)
 
-    async def download_and_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str, status_message):
-        user_id = update.effective_user.id
-        try:
-            await status_message.edit_text(
-                "🔄 *Processing your request...*\n✅ Got track info\n🔍 Searching YouTube...",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            result = self.downloader.download_track(url)
-            if not result:
-                await status_message.edit_text(
-                    "❌ *Download failed*\nCould not find or download the track.",
-                    parse_mode=ParseMode.MARKDOWN
+    async def resolve_spotify_links(self, links: List[str]) -> List[str]:
+        async def resolve(link):
+            if not is_spotify_short_link(link):
+                return link
+            from http_session import resolve_redirect
+            try:
+                spotify_id = extract_spotify_id(await asyncio.to_thread(resolve_redirect, link))
+            except Exception as e:
+                logger.warning(f"Could not resolve {link}: {e}")
+                return None
+            return make_spotify_url(*spotify_id) if spotify_id else None
+
+        resolved = await asyncio.gather(*(resolve(link) for link in links))
+        return list(dict.fromkeys(link for link in resolved if link))
+
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.inline_query.query.strip()
+        links = find_spotify_links(query)
+        button = None
+        if links:
+            links = await self.resolve_spotify_links(links)
+            track_ids = [content_id for content_type, content_id in map(extract_spotify_id, links) if content_type == 'track']
+            cached = {track_id: await asyncio.to_thread(self.file_ids.get, track_id) for track_id in track_ids}
+            results = [row for row in cached.values() if row]
+            missing = [make_spotify_url('track', track_id) for track_id, row in cached.items() if not row]
+        else:
+            missing = []
+            results = await asyncio.to_thread(self.file_ids.search, query, INLINE_RESULTS_LIMIT)
+            if not results and query:
+                button = InlineQueryResultsButton(
+                    text="🎵 Not downloaded yet, get it in the bot", start_parameter=self.remember_inline_search(query)
                 )
-                return
-            file_path, track_info = result
-            file_size = os.path.getsize(file_path)
-            if file_size > MAX_FILE_SIZE:
-                self.downloader.cleanup_file(file_path)
-                await status_message.edit_text(
-                    f"❌ *File too large*\nThe file ({format_file_size(file_size)}) exceeds Telegram's limit.",
-                    parse_mode=ParseMode.MARKDOWN
+        if missing and await self.queue_inline_fetch(update.effective_user.id, missing):
+            button = InlineQueryResultsButton(text="⏳ Fetching, try again in a moment", start_parameter='fetching')
+        if not results and not button:
+            button = InlineQueryResultsButton(text="🎵 Not downloaded yet, open the bot", start_parameter='inline')
+        metrics.inline_queries.inc(result='hit' if results else 'miss')
+        await update.inline_query.answer(
+            [InlineQueryResultCachedAudio(id=row['track_id'], audio_file_id=row['file_id']) for row in results],
+            cache_time=0 if missing or not results else INLINE_CACHE_TIME,
+            button=button
+        )
+
+    def remember_inline_search(self, query: str) -> str:
+        query = ' '.join(query.split())
+        token = hashlib.sha1(query.lower().encode()).hexdigest()[:16]
+        self.inline_searches[token] = query
+        self.inline_searches.move_to_end(token)
+        while len(self.inline_searches) > MAX_INLINE_SEARCHES:
+            self.inline_searches.popitem(last=False)
+        return INLINE_SEARCH_PREFIX + token
+
+    async def download_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE, query: str):
+        status_message = await update.message.reply_text(
+            f"🔍 Searching Spotify for: {query}"
+        )
+        downloader = await self.load_downloader()
+        track_id = await asyncio.to_thread(downloader.search_track_id, query)
+        if not track_id:
+            await status_message.edit_text(f"❌ No Spotify track found for: {query}")
+            return
+        await self.enqueue_download(update, context, make_spotify_url('track', track_id), status_message)
+
+    async def queue_inline_fetch(self, user_id: int, urls: List[str]) -> bool:
+        if not CACHE_CHAT_ID:
+            return False
+        now = time.monotonic()
+        self.inline_fetches = {url: queued for url, queued in self.inline_fetches.items() if now - queued < JOB_LEASE_SECONDS}
+        urls = [url for url in urls if url not in self.inline_fetches]
+        if urls:
+            self.inline_fetches.update(dict.fromkeys(urls, now))
+            job_id = await asyncio.to_thread(self.job_queue.enqueue, user_id, CACHE_CHAT_ID, ' '.join(urls))
+            logger.info(f"Queued inline fetch job {job_id} for {len(urls)} tracks")
+            if self.worker:
+                self.worker.notify()
+        return True
+
+    async def enqueue_download(self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str, status_message):
+        status = StatusReporter(status_message)
+        if ' ' not in url:
+            content_type, content_id = extract_spotify_id(url)
+            served = content_type == 'track' and await self.send_cached_audio(update, context, content_id, status)
+            if served:
+                await asyncio.to_thread(
+                    self.job_queue.record_served, update.effective_user.id, update.effective_chat.id, url,
+                    update.message.message_id
                 )
+                if self.prefetcher:
+                    self.prefetcher.note_request(served)
                 return
-            await status_message.edit_text(
-                "🔄 *Processing your request...*\n✅ Got track info\n✅ Found YouTube video\n✅ Downloaded audio\n✅ Added metadata\n📤 Sending file...",
-                parse_mode=ParseMode.MARKDOWN
+        if self.worker:
+            self.worker.register_status(update.effective_chat.id, status_message.message_id, status)
+        try:
+            position = await asyncio.to_thread(
+                self.job_queue.enqueue_with_position, update.effective_user.id, update.effective_chat.id, url,
+                update.message.message_id, status_message.message_id
             )
-            with open(file_path, 'rb') as audio_file:
-                await context.bot.send_audio(
+        except Exception:
+            if self.worker:
+                self.worker.unregister_status(update.effective_chat.id, status_message.message_id)
+            raise
+        status.update(f"🔄 *Processing your request...*\n⏳ Queued for download (position {position})")
+        if self.worker:
+            self.worker.notify()
+
+    async def record_stage(self, job_id: Optional[int], stage: str):
+        if job_id is not None:
+            await asyncio.to_thread(self.job_queue.set_stage, job_id, stage)
+
+    async def report_queue_position(self, status: StatusReporter, position: int):
+        if position == 0:
+            text = "🔄 *Processing your request...*\n✅ Got track info\n🔍 Searching YouTube..."
+        else:
+            text = f"🔄 *Processing your request...*\n⏳ Waiting in queue (position {position})"
+        status.update(text)
+
+    def make_progress_callback(self, track_id: str) -> Optional[Callable[[int], None]]:
+        if self.pool.kind == 'process':
+            return None
+        loop = asyncio.get_running_loop()
+
+        def on_progress(percent: int):
+            try:
+                loop.call_soon_threadsafe(self.report_download_progress, track_id, percent)
+            except RuntimeError:
+                pass
+
+        return on_progress
+
+    def report_download_progress(self, track_id: str, percent: int):
+        for status in self.progress_watchers.get(track_id, ()):
+            status.update(
+                f"🔄 *Processing your request...*\n✅ Got track info\n✅ Found YouTube video\n⬇️ Downloading audio... {percent}%"
+            )
+
+    def build_success_text(self, track_info, file_size: int, quality: Optional[str] = None) -> str:
+        text = (
+            f"✅ *Download Complete!*\n\n"
+            f"🎵 **{track_info['name']}**\n"
+            f"👤 **{track_info['artist']}**\n"
+            f"💿 **{track_info['album']}**\n"
+            f"📁 **Size:** {format_file_size(file_size)}\n"
+        )
+        if quality:
+            text += f"🎧 **Quality:** {quality}\n"
+        return text + "\nEnjoy your music! 🎶"
+
+    async def send_cached_audio(self, update: Update, context: ContextTypes.DEFAULT_TYPE, track_id: str, status: Optional[StatusReporter] = None) -> Optional[Dict[str, Any]]:
+        cached = await asyncio.to_thread(self.file_ids.get, track_id)
+        if not cached:
+            return None
+        try:
+            with metrics.span('telegram_send_cached'):
+                await rate_governor.telegram.call_async(
+                    'telegram_send_cached', context.bot.send_audio, idempotent=False,
+                    chat_id=update.effective_chat.id,
+                    audio=cached['file_id'],
+                    title=f"{cached['artist']} - {cached['name']}",
+                    performer=cached['artist'],
+                    duration=int(cached['duration_ms'] / 1000)
+                )
+        except BadRequest as e:
+            logger.warning(f"Cached file_id for track {track_id} was rejected: {e}")
+            await asyncio.to_thread(self.file_ids.delete, track_id)
+            return None
+        await asyncio.to_thread(self.file_ids.touch, track_id)
+        logger.info(f"Served track {track_id} from file_id cache")
+        if status:
+            status.update(self.build_success_text(cached, cached['file_size'] or 0))
+        return cached
+
+    async def upload_audio(self, update: Update, context: ContextTypes.DEFAULT_TYPE, file_path, track_info, file_size: int):
+        with self.downloader.open_audio(file_path) as audio_file, metrics.span('telegram_upload'):
+            async def send():
+                audio_file.seek(0)
+                return await context.bot.send_audio(
                     chat_id=update.effective_chat.id,
                     audio=audio_file,
                     title=f"{track_info['artist']} - {track_info['name']}",
                     performer=track_info['artist'],
                     duration=int(track_info['duration_ms'] / 1000),
-                    filename=f"{track_info['artist']} - {track_info['name']}.mp3"
+                    filename=f"{track_info['artist']} - {track_info['name']}{self.downloader.audio_extension(file_path)}"
+                )
+
+            message = await rate_governor.telegram.call_async('telegram_upload', send, idempotent=False)
+        metrics.uploaded_bytes.inc(file_size)
+        if message.audio:
+            await asyncio.to_thread(
+                self.file_ids.put, track_info['id'], message.audio.file_id, track_info,
+                file_size=file_size, file_unique_id=message.audio.file_unique_id
+            )
+
+    def schedule_download(self, user_id: int, method_name: str, argument, status: Optional[StatusReporter] = None,
+                          progress: Optional[Callable[[int], None]] = None):
+        on_position = None
+        if status:
+            on_position = lambda position: self.report_queue_position(status, position)
+        options = {'progress': progress} if progress else {}
+        submitted = time.perf_counter()
+
+        async def run():
+            metrics.stage_latency.observe(time.perf_counter() - submitted, stage='queue_wait')
+            with metrics.span('worker'):
+                return await self.pool.run_downloader(method_name, argument, **options)
+
+        return self.scheduler.submit(user_id, run, on_position=on_position)
+
+    async def download_and_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str, status: StatusReporter,
+                                job_id: Optional[int] = None) -> bool:
+        user_id = update.effective_user.id
+        if self.prefetcher:
+            self.prefetcher.note_request()
+        try:
+            urls = url.split()
+            if len(urls) > 1:
+                await self.record_stage(job_id, 'collection')
+                return await self.download_batch(update, context, urls, status)
+            content_type, content_id = extract_spotify_id(url)
+            if content_type in ('album', 'playlist'):
+                await self.record_stage(job_id, 'collection')
+                return await self.download_collection(update, context, content_type, content_id, status)
+            served = await self.send_cached_audio(update, context, content_id, status)
+            if served:
+                if self.prefetcher:
+                    self.prefetcher.note_request(served)
+                return True
+            await self.record_stage(job_id, 'metadata')
+            downloader = await self.load_downloader()
+            track_info = await asyncio.to_thread(downloader.get_track_info, content_id)
+            if not track_info:
+                status.update("❌ *Download failed*\nCould not get the track information.")
+                return False
+            if self.prefetcher:
+                self.prefetcher.note_request(track_info)
+            if not self.downloader.select_bitrate(track_info):
+                estimated_size = estimate_audio_size(track_info['duration_ms'], AUDIO_BITRATES[-1])
+                status.update(
+                    f"❌ *File too large*\nThis track would be about {format_file_size(estimated_size)} "
+                    f"even at the lowest quality, which exceeds Telegram's limit."
                 )
-            success_text = (
-                f"✅ *Download Complete!*\n\n"
-                f"🎵 **{track_info['name']}**\n"
-                f"👤 **{track_info['artist']}**\n"
-                f"💿 **{track_info['album']}**\n"
-                f"📁 **Size:** {format_file_size(file_size)}\n"
-                f"🎧 **Quality:** 320kbps MP3\n\nEnjoy your music! 🎶"
+                return False
+            if self.inflight.is_inflight(content_id):
+                status.update("🔄 *Processing your request...*\n⏳ This track is already being downloaded, sharing it with you...")
+            await self.record_stage(job_id, 'download')
+            watchers = self.progress_watchers.setdefault(content_id, set())
+            watchers.add(status)
+            try:
+                async with self.inflight.lease(
+                    content_id,
+                    lambda: self.schedule_download(
+                        user_id, 'download_track_info', track_info, status, progress=self.make_progress_callback(content_id)
+                    )
+                ) as result:
+                    watchers.discard(status)
+                    async with self.inflight.exclusive(content_id):
+                        return await self.send_download_result(update, context, result, status, job_id)
+            finally:
+                watchers.discard(status)
+                if not watchers and self.progress_watchers.get(content_id) is watchers:
+                    del self.progress_watchers[content_id]
+        except CircuitOpenError as e:
+            logger.warning(f"Shedding request from user {user_id}: {e}")
+            status.update(
+                f"⏳ *Temporarily busy*\nWe are being rate limited by {rate_governor.upstreams[e.upstream].label}. "
+                f"Please try again in about {int(e.retry_in) + 1} seconds."
             )
-            await status_message.edit_text(success_text, parse_mode=ParseMode.MARKDOWN)
-            self.downloader.cleanup_file(file_path)
+            return False
         except Exception as e:
+            metrics.stage_failures.inc(stage='request')
             logger.error(f"Error in download_and_send for user {user_id}: {e}")
-            await status_message.edit_text(
-                "❌ *Download failed*\nAn error occurred during the download process.",
-                parse_mode=ParseMode.MARKDOWN
+            status.update("❌ *Download failed*\nAn error occurred during the download process.")
+            return False
+
+    async def send_download_result(self, update: Update, context: ContextTypes.DEFAULT_TYPE, result, status: StatusReporter,
+                                   job_id: Optional[int] = None) -> bool:
+        if not result:
+            metrics.stage_failures.inc(stage='download_track')
+            status.update("❌ *Download failed*\nCould not find or download the track.")
+            return False
+        file_path, track_info = result
+        if await self.send_cached_audio(update, context, track_info['id'], status):
+            return True
+        file_size = self.downloader.audio_size(file_path)
+        if file_size > MAX_FILE_SIZE:
+            status.update(f"❌ *File too large*\nThe file ({format_file_size(file_size)}) exceeds Telegram's limit.")
+            return False
+        await self.record_stage(job_id, 'upload')
+        status.update(
+            "🔄 *Processing your request...*\n✅ Got track info\n✅ Found YouTube video\n✅ Downloaded audio\n✅ Added metadata\n📤 Sending file..."
+        )
+        await self.upload_audio(update, context, file_path, track_info, file_size)
+        status.update(self.build_success_text(track_info, file_size, self.downloader.describe_audio(file_path)))
+        return True
+
+    async def download_collection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, content_type: str, content_id: str, status: StatusReporter) -> bool:
+        downloader = await self.load_downloader()
+        collection = await asyncio.to_thread(downloader.get_collection_info, content_type, content_id)
+        if not collection or not collection['tracks']:
+            status.update(f"❌ *Download failed*\nCould not get the {content_type} tracks.")
+            return False
+        return await self.deliver_tracks(update, context, f"{content_type}: {collection['name']}", collection['tracks'], status)
+
+    async def download_batch(self, update: Update, context: ContextTypes.DEFAULT_TYPE, urls: List[str], status: StatusReporter) -> bool:
+        downloader = await self.load_downloader()
+        tracks = await asyncio.to_thread(downloader.get_batch_info, [extract_spotify_id(url) for url in urls])
+        if not tracks:
+            status.update("❌ *Download failed*\nCould not get the tracks for any of these links.")
+            return False
+        return await self.deliver_tracks(update, context, f"{len(urls)} links", tracks, status)
+
+    async def deliver_tracks(self, update: Update, context: ContextTypes.DEFAULT_TYPE, title: str, tracks, status: StatusReporter) -> bool:
+        progress = {'sent': 0, 'failed': 0}
+        semaphore = asyncio.Semaphore(COLLECTION_PARALLELISM)
+
+        def report_progress():
+            finished = progress['sent'] + progress['failed'] == len(tracks)
+            heading = "✅ *Finished" if finished else "🔄 *Downloading"
+            text = (
+                f"{heading} {title}*\n"
+                f"✅ Sent: {progress['sent']}/{len(tracks)}"
             )
+            if progress['failed']:
+                text += f"\n❌ Failed: {progress['failed']}"
+            status.update(text)
+
+        async def deliver(track_info):
+            async with semaphore:
+                try:
+                    sent = await self.deliver_collection_track(update, context, track_info)
+                except Exception as e:
+                    logger.error(f"Error delivering track {track_info['id']}: {e}")
+                    sent = False
+            progress['sent' if sent else 'failed'] += 1
+            report_progress()
+
+        report_progress()
+        await asyncio.gather(*(deliver(track_info) for track_info in tracks))
+        return progress['sent'] > 0
+
+    async def deliver_collection_track(self, update: Update, context: ContextTypes.DEFAULT_TYPE, track_info) -> bool:
+        if await self.send_cached_audio(update, context, track_info['id']):
+            return True
+        if not self.downloader.select_bitrate(track_info):
+            return False
+        async with self.inflight.lease(
+            track_info['id'], lambda: self.schedule_download(update.effective_user.id, 'download_track_info', track_info)
+        ) as result, self.inflight.exclusive(track_info['id']):
+            if not result:
+                return False
+            file_path, track_info = result
+            if await self.send_cached_audio(update, context, track_info['id']):
+                return True
+            file_size = self.downloader.audio_size(file_path)
+            if file_size > MAX_FILE_SIZE:
+                return False
+            await self.upload_audio(update, context, file_path, track_info, file_size)
+            return True
+
+    async def shutdown(self, application: Application):
+        if self.warm_up_task and not self.warm_up_task.done():
+            self.warm_up_task.cancel()
+        if self.worker:
+            self.worker.stop()
+        for task in self.background_tasks[1:]:
+            task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        self.pool.shutdown(wait=False)
+        self.file_ids.close()
+        self.job_queue.close()
+        if self._downloader is not None:
+            from http_session import close_http_session
+            close_http_session()
 
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Exception while handling an update: {context.error}")
@@ -144,17 +607,52 @@ class SpotifyBot:
                 "❌ An error occurred. Please try again later."
             )
 
+async def run_worker(bot: SpotifyBot):
+    telegram_bot = Bot(TELEGRAM_TOKEN)
+    await telegram_bot.initialize()
+    worker_task = bot.start_worker(telegram_bot)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, bot.worker.stop)
+        except NotImplementedError:
+            pass
+    bot.startup_times['ready'] = time.perf_counter() - STARTUP_STARTED
+    logger.info(f"Worker ready in {bot.startup_times['ready']:.2f}s")
+    if WARM_UP:
+        bot.warm_up_task = asyncio.create_task(bot.warm_up())
+    try:
+        await worker_task
+    finally:
+        await bot.shutdown(None)
+        await telegram_bot.shutdown()
+
 def main():
     try:
+        imports_done = time.perf_counter() - STARTUP_STARTED
         validate_config()
         bot = SpotifyBot()
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
+        bot.startup_times['imports'] = imports_done
+        if metrics.start_metrics_server():
+            bot.register_metrics()
+        if RUN_MODE == 'worker':
+            asyncio.run(run_worker(bot))
+            return
+        application = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .concurrent_updates(True)
+            .post_init(bot.post_init)
+            .post_shutdown(bot.shutdown)
+            .build()
+        )
         application.add_handler(CommandHandler("start", bot.start_command))
         application.add_handler(CommandHandler("help", bot.help_command))
         application.add_handler(CommandHandler("song", bot.song_command))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_message))
+        application.add_handler(InlineQueryHandler(bot.inline_query))
         application.add_error_handler(bot.error_handler)
-        logging.info("Starting Spotify Downloader Bot...")
+        logging.info(f"Starting Spotify Downloader Bot ({RUN_MODE} mode)...")
         application.run_polling(allowed_updates=Update.ALL_TYPES)
     except Exception as e:
         logger.error(f"Failed to start bot: {e}")
@@ -5,10 +5,62 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 SPOTIPY_CLIENT_ID = os.getenv('SPOTIPY_CLIENT_ID')
 SPOTIPY_CLIENT_SECRET = os.getenv('SPOTIPY_CLIENT_SECRET')
 DOWNLOAD_PATH = os.getenv('DOWNLOAD_PATH', 'downloads')
+CACHE_PATH = os.getenv('CACHE_PATH', 'cache')
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL').upper()
+FILE_ID_CACHE_PATH = os.getenv('FILE_ID_CACHE_PATH', os.path.join(CACHE_PATH, 'file_ids.sqlite3'))
+AUDIO_CACHE_PATH = os.getenv('AUDIO_CACHE_PATH', os.path.join(CACHE_PATH, 'audio'))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_MB', '2048')) * 1024 * 1024
+AUDIO_CACHE_MIN_AGE = int(os.getenv('AUDIO_CACHE_MIN_AGE', '600'))
+METADATA_CACHE_PATH = os.getenv('METADATA_CACHE_PATH', os.path.join(CACHE_PATH, 'metadata.sqlite3'))
+METADATA_CACHE_SIZE = int(os.getenv('METADATA_CACHE_SIZE', '10000'))
+SPOTIFY_CACHE_TTL = int(os.getenv('SPOTIFY_CACHE_TTL', str(7 * 24 * 3600)))
+YOUTUBE_CACHE_TTL = int(os.getenv('YOUTUBE_CACHE_TTL', str(3 * 24 * 3600)))
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', '3600'))
+COVER_ART_CACHE_SIZE = int(os.getenv('COVER_ART_CACHE_SIZE', '256'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', '15'))
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'disk')
+MEMORY_SCRATCH_PATH = os.getenv('MEMORY_SCRATCH_PATH', '/dev/shm/spotify-downloader' if os.path.isdir('/dev/shm') else DOWNLOAD_PATH)
+MEMORY_BUFFER_LIMIT = int(os.getenv('MEMORY_BUFFER_LIMIT_MB', '256')) * 1024 * 1024
 MAX_FILE_SIZE = 50 * 1024 * 1024
 AUDIO_QUALITY = '320k'
-MAX_SEARCH_RESULTS = 5
+AUDIO_BITRATES = ['320k', '256k', '192k', '160k', '128k', '96k']
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'mp3')
+MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', '5'))
 SEARCH_LANGUAGE = 'en'
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', '4'))
+WORKER_POOL_TYPE = os.getenv('WORKER_POOL_TYPE', 'thread')
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv('MAX_CONCURRENT_DOWNLOADS', str(WORKER_POOL_SIZE)))
+COLLECTION_PARALLELISM = int(os.getenv('COLLECTION_PARALLELISM', '3'))
+MAX_COLLECTION_TRACKS = int(os.getenv('MAX_COLLECTION_TRACKS', '200'))
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+RUN_MODE = os.getenv('RUN_MODE', 'all')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(CACHE_PATH, 'jobs.sqlite3'))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '600'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '1'))
+WORKER_MAX_JOBS = int(os.getenv('WORKER_MAX_JOBS', str(MAX_CONCURRENT_DOWNLOADS * 4)))
+ORPHAN_MAX_AGE = int(os.getenv('ORPHAN_MAX_AGE', '3600'))
+SWEEP_INTERVAL = int(os.getenv('SWEEP_INTERVAL', '900'))
+STATUS_UPDATE_INTERVAL = float(os.getenv('STATUS_UPDATE_INTERVAL', '1.5'))
+SPOTIFY_RATE_LIMIT = float(os.getenv('SPOTIFY_RATE_LIMIT', '10'))
+YOUTUBE_RATE_LIMIT = float(os.getenv('YOUTUBE_RATE_LIMIT', '5'))
+TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', '25'))
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '30'))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '5'))
+CIRCUIT_BREAKER_RESET = float(os.getenv('CIRCUIT_BREAKER_RESET', '60'))
+PREFETCH = os.getenv('PREFETCH', 'true').lower() in ('1', 'true', 'yes')
+PREFETCH_IDLE_SECONDS = float(os.getenv('PREFETCH_IDLE_SECONDS', '30'))
+PREFETCH_ALBUM_TRACKS = int(os.getenv('PREFETCH_ALBUM_TRACKS', '10'))
+PREFETCH_TRENDING_WINDOW = int(os.getenv('PREFETCH_TRENDING_WINDOW', str(24 * 3600)))
+PREFETCH_TRENDING_LIMIT = int(os.getenv('PREFETCH_TRENDING_LIMIT', '20'))
+CACHE_CHAT_ID = int(os.getenv('CACHE_CHAT_ID', '0'))
+INLINE_RESULTS_LIMIT = int(os.getenv('INLINE_RESULTS_LIMIT', '20'))
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '300'))
+WARM_UP = os.getenv('WARM_UP', 'true').lower() in ('1', 'true', 'yes')
 def validate_config():
     required_vars = {
         'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
@@ -18,4 +70,12 @@ def validate_config():
     missing_vars = [var for var, value in required_vars.items() if not value]
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+    if PIPELINE_MODE not in ('disk', 'memory'):
+        raise ValueError(f"Invalid PIPELINE_MODE: {PIPELINE_MODE} (expected 'disk' or 'memory')")
+    if OUTPUT_FORMAT not in ('mp3', 'auto'):
+        raise ValueError(f"Invalid OUTPUT_FORMAT: {OUTPUT_FORMAT} (expected 'mp3' or 'auto')")
+    if RUN_MODE not in ('all', 'ingest', 'worker'):
+        raise ValueError(f"Invalid RUN_MODE: {RUN_MODE} (expected 'all', 'ingest' or 'worker')")
+    if SQLITE_JOURNAL_MODE not in ('WAL', 'DELETE', 'TRUNCATE'):
+        raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {SQLITE_JOURNAL_MODE} (expected 'WAL', 'DELETE' or 'TRUNCATE')")
     return True 
\ No newline at end of file
@@ -0,0 +1,61 @@
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from PIL import Image
+from config import COVER_ART_CACHE_SIZE, HTTP_TIMEOUT
+from http_session import get_http_session
+from utils import logger
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+def to_jpeg(data: bytes) -> bytes:
+    if data.startswith(JPEG_MAGIC):
+        return data
+    img = Image.open(io.BytesIO(data))
+    img_byte_arr = io.BytesIO()
+    img.convert('RGB').save(img_byte_arr, format='JPEG')
+    return img_byte_arr.getvalue()
+
+class CoverArtCache:
+    def __init__(self, max_entries: int = COVER_ART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.images: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.fetch_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, url: str) -> Optional[bytes]:
+        with self.lock:
+            data = self.images.get(url)
+            if data is not None:
+                self.images.move_to_end(url)
+            return data
+
+    def get(self, url: str) -> Optional[bytes]:
+        data = self._lookup(url)
+        if data is not None:
+            self.hits += 1
+            return data
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(url, threading.Lock())
+        try:
+            with fetch_lock:
+                data = self._lookup(url)
+                if data is not None:
+                    self.hits += 1
+                    return data
+                self.misses += 1
+                response = get_http_session().get(url, timeout=HTTP_TIMEOUT)
+                response.raise_for_status()
+                data = to_jpeg(response.content)
+                with self.lock:
+                    self.images[url] = data
+                    while len(self.images) > self.max_entries:
+                        self.images.popitem(last=False)
+                logger.info(f"Fetched cover art: {url}")
+                return data
+        finally:
+            with self.lock:
+                self.fetch_locks.pop(url, None)
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, Tuple
+from config import ORPHAN_MAX_AGE, SWEEP_INTERVAL
+from utils import format_file_size, logger
+import metrics
+
+ORPHAN_SUFFIXES = ('.part', '.ytdl', '.tmp', '.temp', '.mp3', '.m4a', '.webm', '.opus', '.ogg', '.jpg', '.png', '.webp')
+
+class DiskJanitor:
+    def __init__(self, directories: Dict[str, str], sweep: Iterable[str], max_age: float = ORPHAN_MAX_AGE,
+                 interval: float = SWEEP_INTERVAL, suffixes: Tuple[str, ...] = ORPHAN_SUFFIXES):
+        self.directories = directories
+        self.sweep_paths = {os.path.abspath(directories[name]) for name in sweep}
+        self.suffixes = suffixes
+        self.max_age = max_age
+        self.interval = interval
+        self.usage: Dict[str, Tuple[int, int]] = {}
+        self.reclaimed_bytes = 0
+
+    def sweep(self) -> Dict[str, Tuple[int, int]]:
+        cutoff = time.time() - self.max_age
+        usage = {}
+        seen = set()
+        for name, directory in self.directories.items():
+            path = os.path.abspath(directory)
+            if path in seen or not os.path.isdir(path):
+                continue
+            seen.add(path)
+            files = 0
+            total = 0
+            for entry in os.scandir(path):
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                    if path in self.sweep_paths and stat.st_mtime < cutoff and entry.name.lower().endswith(self.suffixes):
+                        os.remove(entry.path)
+                        self.reclaimed_bytes += stat.st_size
+                        metrics.reclaimed_bytes.inc(stat.st_size)
+                        logger.info(f"Removed orphaned file {entry.path} ({format_file_size(stat.st_size)})")
+                        continue
+                except OSError as e:
+                    logger.warning(f"Could not sweep {entry.path}: {e}")
+                    continue
+                files += 1
+                total += stat.st_size
+            usage[name] = (files, total)
+        self.usage = usage
+        logger.info("Disk usage: " + ", ".join(
+            f"{name} {format_file_size(total)} in {files} files" for name, (files, total) in usage.items()
+        ))
+        return usage
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Disk sweep failed: {e}")
+            await asyncio.sleep(self.interval)
\ No newline at end of file
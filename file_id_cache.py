@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from config import FILE_ID_CACHE_PATH, SQLITE_JOURNAL_MODE
+from utils import logger
+
+class FileIdCache:
+    def __init__(self, path: str = FILE_ID_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                " track_id TEXT PRIMARY KEY,"
+                " file_id TEXT NOT NULL,"
+                " file_unique_id TEXT,"
+                " name TEXT,"
+                " artist TEXT,"
+                " album TEXT,"
+                " album_id TEXT,"
+                " duration_ms INTEGER,"
+                " file_size INTEGER,"
+                " created_at REAL,"
+                " last_used_at REAL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(tracks)")}
+            if 'album_id' not in columns:
+                self.conn.execute("ALTER TABLE tracks ADD COLUMN album_id TEXT")
+        logger.info(f"Opened file_id cache: {path}")
+
+    def get(self, track_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM tracks WHERE track_id = ?", (track_id,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(row)
+
+    def touch(self, track_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tracks SET hits = hits + 1, last_used_at = ? WHERE track_id = ?", (time.time(), track_id)
+            )
+
+    def contains(self, track_id: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM tracks WHERE track_id = ?", (track_id,)).fetchone() is not None
+
+    def put(self, track_id: str, file_id: str, track_info: Dict[str, Any],
+            file_size: int = 0, file_unique_id: Optional[str] = None) -> None:
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO tracks (track_id, file_id, file_unique_id, name, artist, album, album_id,"
+                " duration_ms, file_size, created_at, last_used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(track_id) DO UPDATE SET file_id = excluded.file_id,"
+                " file_unique_id = excluded.file_unique_id, file_size = excluded.file_size,"
+                " album_id = COALESCE(excluded.album_id, album_id), last_used_at = excluded.last_used_at",
+                (track_id, file_id, file_unique_id, track_info.get('name'), track_info.get('artist'),
+                 track_info.get('album'), track_info.get('album_id'), track_info.get('duration_ms'), file_size, now, now)
+            )
+        logger.info(f"Cached Telegram file_id for track {track_id}")
+
+    def delete(self, track_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM tracks WHERE track_id = ?", (track_id,))
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        terms = [term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') for term in query.lower().split()]
+        where = " AND ".join(
+            "LOWER(COALESCE(name, '') || ' ' || COALESCE(artist, '') || ' ' || COALESCE(album, '')) LIKE ? ESCAPE '\\'"
+            for _ in terms
+        )
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM tracks" + (f" WHERE {where}" if terms else "")
+                + " ORDER BY hits DESC, last_used_at DESC LIMIT ?",
+                [f"%{term}%" for term in terms] + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,30 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import HTTP_POOL_SIZE
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def resolve_redirect(url: str, timeout: float = 10) -> str:
+    response = get_http_session().head(url, allow_redirects=True, timeout=timeout)
+    response.close()
+    return response.url
+
+def close_http_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
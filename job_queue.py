@@ -0,0 +1,208 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from config import JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, SQLITE_JOURNAL_MODE
+from utils import logger
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobQueue:
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: int = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id INTEGER NOT NULL,"
+                " chat_id INTEGER NOT NULL,"
+                " message_id INTEGER,"
+                " status_message_id INTEGER,"
+                " url TEXT NOT NULL,"
+                " state TEXT NOT NULL DEFAULT 'queued',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " worker TEXT,"
+                " host TEXT,"
+                " pid INTEGER,"
+                " leased_until REAL,"
+                " stage TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (('stage', 'TEXT'), ('host', 'TEXT'), ('pid', 'INTEGER')):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        logger.info(f"Opened job queue: {path}")
+
+    def enqueue(self, user_id: int, chat_id: int, url: str, message_id: Optional[int] = None,
+                status_message_id: Optional[int] = None) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (user_id, chat_id, message_id, status_message_id, url, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, chat_id, message_id, status_message_id, url, now, now)
+            )
+        logger.info(f"Queued job {cursor.lastrowid} for user {user_id}: {url}")
+        return cursor.lastrowid
+
+    def enqueue_with_position(self, user_id: int, chat_id: int, url: str, message_id: Optional[int] = None,
+                              status_message_id: Optional[int] = None) -> int:
+        return self.position(self.enqueue(user_id, chat_id, url, message_id, status_message_id))
+
+    def record_served(self, user_id: int, chat_id: int, url: str, message_id: Optional[int] = None) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (user_id, chat_id, message_id, url, state, stage, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'done', 'cached', ?, ?)",
+                (user_id, chat_id, message_id, url, now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT * FROM jobs WHERE state = 'queued' OR (state = 'running' AND leased_until < :now)"
+                    " ORDER BY (SELECT COUNT(*) FROM jobs AS active WHERE active.user_id = jobs.user_id"
+                    " AND active.state = 'running' AND active.leased_until >= :now), id LIMIT 1",
+                    {'now': now}
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'running', worker = ?, host = ?, pid = ?, leased_until = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker, socket.gethostname(), os.getpid(), now + self.lease_seconds, now, row['id'])
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        job = dict(row, state='running', worker=worker, attempts=row['attempts'] + 1)
+        if row['state'] == 'running':
+            logger.warning(f"Reclaimed job {job['id']} from {row['worker']} after its lease expired")
+        return job
+
+    def set_stage(self, job_id: int, stage: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job_id)
+            )
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def recover(self, host: str, worker: str) -> int:
+        if os.name == 'nt':
+            return 0
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, worker, pid FROM jobs WHERE state = 'running' AND host = ? AND worker != ?", (host, worker)
+            ).fetchall()
+        recovered = 0
+        for row in rows:
+            if row['pid'] is None or (row['pid'] != os.getpid() and _process_alive(row['pid'])):
+                continue
+            with self.lock:
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'queued', worker = NULL, leased_until = NULL, updated_at = ?"
+                    " WHERE id = ? AND worker = ? AND state = 'running'",
+                    (time.time(), row['id'], row['worker'])
+                )
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} jobs left running by stopped workers on {host}")
+        return recovered
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET leased_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (now + self.lease_seconds, now, job_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str) -> None:
+        self._finish(job_id, worker, 'done')
+
+    def fail(self, job_id: int, worker: str, error: str) -> None:
+        self._finish(job_id, worker, 'failed', error)
+
+    def release(self, job_id: int, worker: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL, leased_until = NULL, attempts = attempts - 1,"
+                " updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (time.time(), job_id, worker)
+            )
+
+    def _finish(self, job_id: int, worker: str, state: str, error: Optional[str] = None) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, leased_until = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ?",
+                (state, error, time.time(), job_id, worker)
+            )
+
+    def position(self, job_id: int) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND id <= ?", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def trending(self, since: float, limit: int) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, COUNT(*) AS requests FROM jobs WHERE created_at >= ? AND url NOT LIKE '% %'"
+                " GROUP BY url ORDER BY requests DESC, MAX(id) DESC LIMIT ?",
+                (time.time() - since, limit)
+            ).fetchall()
+        return [row['url'] for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - older_than,)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import (
+    METADATA_CACHE_PATH, METADATA_CACHE_SIZE, SPOTIFY_CACHE_TTL, YOUTUBE_CACHE_TTL, NEGATIVE_CACHE_TTL, SQLITE_JOURNAL_MODE
+)
+from utils import logger
+
+MISSING = object()
+
+DEFAULT_TTLS = {
+    'spotify': SPOTIFY_CACHE_TTL,
+    'youtube': YOUTUBE_CACHE_TTL,
+}
+
+class MetadataCache:
+    def __init__(self, path: str = METADATA_CACHE_PATH, max_entries: int = METADATA_CACHE_SIZE,
+                 ttls: Optional[Dict[str, int]] = None, negative_ttl: int = NEGATIVE_CACHE_TTL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.memory: 'OrderedDict[Tuple[str, str], Tuple[float, Any]]' = OrderedDict()
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " source TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (source, key))"
+            )
+            purged = self.conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),)).rowcount
+        logger.info(f"Opened metadata cache: {path} ({purged} expired entries purged)")
+
+    def get(self, source: str, key: str) -> Any:
+        now = time.time()
+        counters = self.counters[source]
+        with self.lock:
+            entry = self.memory.get((source, key))
+            if entry and entry[0] > now:
+                self.memory.move_to_end((source, key))
+                counters['memory_hits'] += 1
+                if entry[1] is None:
+                    counters['negative_hits'] += 1
+                return entry[1]
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM entries WHERE source = ? AND key = ? AND expires_at > ?",
+                (source, key, now)
+            ).fetchone()
+            if row is None:
+                counters['misses'] += 1
+                return MISSING
+            value = json.loads(row[0])
+            self._remember(source, key, row[1], value)
+            counters['store_hits'] += 1
+            if value is None:
+                counters['negative_hits'] += 1
+            return value
+
+    def set(self, source: str, key: str, value: Any) -> None:
+        ttl = self.negative_ttl if value is None else self.ttls.get(source, self.negative_ttl)
+        expires_at = time.time() + ttl
+        with self.lock:
+            self._remember(source, key, expires_at, value)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (source, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (source, key, json.dumps(value), expires_at)
+                )
+
+    def get_or_load(self, source: str, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.get(source, key)
+        if value is MISSING:
+            value = loader()
+            self.set(source, key, value)
+        return value
+
+    def _remember(self, source: str, key: str, expires_at: float, value: Any) -> None:
+        self.memory[(source, key)] = (expires_at, value)
+        self.memory.move_to_end((source, key))
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {source: dict(counters) for source, counters in self.counters.items()}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
\ No newline at end of file
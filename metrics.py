@@ -0,0 +1,166 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from config import METRICS_PORT
+from utils import logger
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+enabled = METRICS_PORT > 0
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in items) + '}'
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not enabled:
+            return
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in self.values.items())
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.values: Dict[Tuple, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        if not enabled:
+            return
+        key = _label_key(labels)
+        with self.lock:
+            series = self.values.setdefault(key, [0] * len(self.buckets) + [0, 0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in self.values.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+        return lines
+
+class CallbackMetric:
+    def __init__(self, name: str, help_text: str, kind: str, callback: Callable[[], Dict[Tuple, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            for labels, value in self.callback().items():
+                lines.append(f"{self.name}{_format_labels(_label_key(dict(labels)))} {value}")
+        except Exception as e:
+            logger.warning(f"Could not collect metric {self.name}: {e}")
+        return lines
+
+stage_latency = Histogram('spotify_bot_stage_seconds', 'Latency of each pipeline stage')
+stage_failures = Counter('spotify_bot_stage_failures_total', 'Failures by pipeline stage')
+downloaded_bytes = Counter('spotify_bot_downloaded_bytes_total', 'Bytes downloaded by yt-dlp')
+uploaded_bytes = Counter('spotify_bot_uploaded_bytes_total', 'Bytes uploaded to Telegram')
+reclaimed_bytes = Counter('spotify_bot_reclaimed_bytes_total', 'Bytes of orphaned files removed by the disk sweep')
+inline_queries = Counter('spotify_bot_inline_queries_total', 'Inline queries by result')
+upstream_retries = Counter('spotify_bot_upstream_retries_total', 'Retried upstream calls by upstream and stage')
+prefetches = Counter('spotify_bot_prefetches_total', 'Tracks prefetched during idle time by result')
+upstream_rejections = Counter('spotify_bot_upstream_rejections_total', 'Calls shed while an upstream circuit was open')
+
+_metrics: List = [stage_latency, stage_failures, downloaded_bytes, uploaded_bytes, reclaimed_bytes, inline_queries,
+                  upstream_retries, upstream_rejections, prefetches]
+
+def register_callback(name: str, help_text: str, callback: Callable[[], Dict[Tuple, float]], kind: str = 'gauge') -> None:
+    _metrics.append(CallbackMetric(name, help_text, kind, callback))
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+class Span:
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.failed = False
+
+    def fail(self) -> None:
+        self.failed = True
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_latency.observe(time.perf_counter() - self.start, stage=self.stage)
+        if exc_type is not None or self.failed:
+            stage_failures.inc(stage=self.stage)
+        return False
+
+class _NullSpan:
+    def fail(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(stage: str):
+    if not enabled:
+        return _NULL_SPAN
+    return Span(stage)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int = METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    if not enabled:
+        return None
+    server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+    return server
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+from config import (
+    PREFETCH_IDLE_SECONDS, PREFETCH_ALBUM_TRACKS, PREFETCH_TRENDING_WINDOW, PREFETCH_TRENDING_LIMIT
+)
+from rate_governor import CircuitOpenError
+from utils import extract_spotify_id, logger
+import metrics
+import rate_governor
+
+PREFETCH_USER = 'prefetch'
+POLL_INTERVAL = 5
+TRENDING_REFRESH_INTERVAL = 3600
+MAX_PENDING_ALBUMS = 100
+MAX_SEEN_TRACKS = 10000
+
+class Prefetcher:
+    def __init__(self, spotify_bot, idle_seconds: float = PREFETCH_IDLE_SECONDS,
+                 album_tracks: int = PREFETCH_ALBUM_TRACKS, trending_window: int = PREFETCH_TRENDING_WINDOW,
+                 trending_limit: int = PREFETCH_TRENDING_LIMIT):
+        self.spotify_bot = spotify_bot
+        self.idle_seconds = idle_seconds
+        self.album_tracks = album_tracks
+        self.trending_window = trending_window
+        self.trending_limit = trending_limit
+        self.albums: 'OrderedDict[str, None]' = OrderedDict()
+        self.candidates: Deque[Dict[str, Any]] = deque()
+        self.seen = set()
+        self.trending_loaded_at = 0.0
+        self.last_request_at = time.monotonic()
+        self.prefetched = 0
+
+    def note_request(self, track_info: Optional[Dict[str, Any]] = None) -> None:
+        self.last_request_at = time.monotonic()
+        if track_info and track_info.get('album_id'):
+            self.albums[track_info['album_id']] = None
+            self.albums.move_to_end(track_info['album_id'])
+            while len(self.albums) > MAX_PENDING_ALBUMS:
+                self.albums.popitem(last=False)
+
+    def is_idle(self) -> bool:
+        return (
+            self.spotify_bot.scheduler.is_idle()
+            and self.spotify_bot.scheduler.running == 0
+            and time.monotonic() - self.last_request_at >= self.idle_seconds
+        )
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                while self.is_idle():
+                    track_info = await self.next_candidate()
+                    if track_info is None:
+                        break
+                    await self.prefetch(track_info)
+            except CircuitOpenError as e:
+                logger.info(f"Pausing prefetch: {e}")
+            except Exception as e:
+                logger.error(f"Prefetch failed: {e}")
+
+    async def next_candidate(self) -> Optional[Dict[str, Any]]:
+        downloader = await self.spotify_bot.load_downloader()
+        while self.is_idle():
+            while self.candidates:
+                track_info = self.candidates.popleft()
+                if (track_info['id'] in self.seen
+                        or await asyncio.to_thread(self.spotify_bot.file_ids.contains, track_info['id'])
+                        or await asyncio.to_thread(downloader.is_audio_cached, track_info)):
+                    continue
+                return track_info
+            if not self.albums and not await self.load_trending():
+                return None
+            album_id, _ = self.albums.popitem()
+            collection = await asyncio.to_thread(downloader.get_collection_info, 'album', album_id)
+            if collection:
+                self.candidates.extend(collection['tracks'][:self.album_tracks])
+        return None
+
+    async def load_trending(self) -> bool:
+        if self.trending_loaded_at and time.monotonic() - self.trending_loaded_at < TRENDING_REFRESH_INTERVAL:
+            return False
+        self.trending_loaded_at = time.monotonic()
+        urls = await asyncio.to_thread(self.spotify_bot.job_queue.trending, self.trending_window, self.trending_limit)
+        track_ids = [content_id for content_type, content_id in filter(None, map(extract_spotify_id, urls)) if content_type == 'track']
+        downloader = await self.spotify_bot.load_downloader()
+        for track_info in await asyncio.to_thread(downloader.get_tracks_info, track_ids):
+            if track_info.get('album_id'):
+                self.albums.setdefault(track_info['album_id'], None)
+        logger.info(f"Loaded {len(self.albums)} albums from {len(track_ids)} trending tracks for prefetch")
+        return bool(self.albums)
+
+    async def prefetch(self, track_info: Dict[str, Any]) -> None:
+        if len(self.seen) >= MAX_SEEN_TRACKS:
+            self.seen.clear()
+        self.seen.add(track_info['id'])
+        rate_governor.ensure_available('spotify', 'youtube')
+        downloader = self.spotify_bot.downloader
+        if not downloader.audio_cache.enabled:
+            await asyncio.to_thread(
+                downloader.search_youtube, track_info['artist'], track_info['name'], track_info['duration_ms']
+            )
+            metrics.prefetches.inc(result='search')
+            return
+        logger.info(f"Prefetching {track_info['artist']} - {track_info['name']}")
+        async with self.spotify_bot.inflight.lease(
+            track_info['id'], lambda: self.spotify_bot.schedule_download(PREFETCH_USER, 'download_track_info', track_info)
+        ) as result:
+            if result:
+                self.prefetched += 1
+            metrics.prefetches.inc(result='cached' if result else 'failed')
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import socket
+import types
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+from telegram import Bot, Chat, Message, Update, User
+from config import WORKER_MAX_JOBS, WORKER_POLL_INTERVAL, JOB_RETENTION_SECONDS
+from job_queue import JobQueue
+from status_reporter import StatusReporter
+from utils import logger
+import metrics
+
+class QueueWorker:
+    def __init__(self, spotify_bot, queue: JobQueue, telegram_bot: Bot,
+                 concurrency: int = WORKER_MAX_JOBS, poll_interval: float = WORKER_POLL_INTERVAL):
+        self.spotify_bot = spotify_bot
+        self.queue = queue
+        self.telegram_bot = telegram_bot
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.host = socket.gethostname()
+        self.worker_id = f"{self.host}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.active: Dict[int, asyncio.Task] = {}
+        self.reporters: Dict[Tuple[int, int], StatusReporter] = {}
+        self.stopping = asyncio.Event()
+        self.wakeup = asyncio.Event()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.wakeup.set()
+        for task in self.active.values():
+            task.cancel()
+
+    def register_status(self, chat_id: int, status_message_id: int, status: StatusReporter) -> None:
+        self.reporters[(chat_id, status_message_id)] = status
+
+    def unregister_status(self, chat_id: int, status_message_id: int) -> None:
+        self.reporters.pop((chat_id, status_message_id), None)
+
+    def notify(self) -> None:
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        await asyncio.to_thread(self.queue.recover, self.host, self.worker_id)
+        purged = await asyncio.to_thread(self.queue.purge, JOB_RETENTION_SECONDS)
+        slots = self.concurrency or 'unlimited'
+        logger.info(f"Worker {self.worker_id} started with {slots} slots ({purged} old jobs purged)")
+        heartbeat = asyncio.create_task(self.heartbeat())
+        try:
+            while not self.stopping.is_set():
+                while not self.concurrency or len(self.active) < self.concurrency:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self.process(job))
+                    self.active[job['id']] = task
+                    task.add_done_callback(lambda _, job_id=job['id']: self.finished(job_id))
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            heartbeat.cancel()
+            if self.active:
+                logger.info(f"Waiting for {len(self.active)} running jobs to finish")
+                await asyncio.gather(*self.active.values(), return_exceptions=True)
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    def finished(self, job_id: int) -> None:
+        self.active.pop(job_id, None)
+        self.wakeup.set()
+
+    async def heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            for job_id in list(self.active):
+                if not await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id):
+                    logger.warning(f"Lost the lease on job {job_id}")
+
+    def build_update(self, job: Dict[str, Any]) -> Update:
+        chat = Chat(id=job['chat_id'], type=Chat.PRIVATE)
+        user = User(id=job['user_id'], first_name=str(job['user_id']), is_bot=False)
+        message = Message(
+            message_id=job['message_id'] or 0, date=datetime.now(timezone.utc), chat=chat, from_user=user, text=job['url']
+        )
+        message.set_bot(self.telegram_bot)
+        return Update(update_id=job['id'], message=message)
+
+    def build_status(self, job: Dict[str, Any]) -> StatusReporter:
+        status = self.reporters.pop((job['chat_id'], job['status_message_id']), None)
+        if status is not None:
+            return status
+        if job['status_message_id'] is None:
+            return StatusReporter(None)
+        chat = Chat(id=job['chat_id'], type=Chat.PRIVATE)
+        status_message = Message(message_id=job['status_message_id'], date=datetime.now(timezone.utc), chat=chat)
+        status_message.set_bot(self.telegram_bot)
+        return StatusReporter(status_message)
+
+    async def process(self, job: Dict[str, Any]) -> None:
+        status = self.build_status(job)
+        try:
+            if job['attempts'] > self.queue.max_attempts:
+                logger.error(f"Giving up on job {job['id']} after {job['attempts'] - 1} attempts")
+                status.update("❌ *Download failed*\nThe download was interrupted too many times.")
+                await asyncio.to_thread(self.queue.fail, job['id'], self.worker_id, 'too many attempts')
+                return
+            if job['attempts'] > 1 or job['stage']:
+                logger.info(f"Resuming job {job['id']} interrupted during {job['stage'] or 'queue'}: {job['url']}")
+                status.update("🔄 *Processing your request...*\n♻️ Resuming your download after an interruption...")
+            else:
+                logger.info(f"Processing job {job['id']}: {job['url']}")
+            update = self.build_update(job)
+            context = types.SimpleNamespace(bot=self.telegram_bot, args=None)
+            with metrics.span('request'):
+                sent = await self.spotify_bot.download_and_send(update, context, job['url'], status, job_id=job['id'])
+            if sent:
+                await asyncio.to_thread(self.queue.complete, job['id'], self.worker_id)
+            else:
+                await asyncio.to_thread(self.queue.fail, job['id'], self.worker_id, 'download failed')
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.release, job['id'], self.worker_id)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            await asyncio.to_thread(self.queue.fail, job['id'], self.worker_id, str(e))
+        finally:
+            await status.wait()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import re
+from typing import Any, Dict, List, Optional, Union
+
+DURATION_TOLERANCE = 10
+MAX_DURATION_RATIO = 1.5
+MIN_DURATION_SLACK = 60
+
+WEIGHTS = {
+    'duration': 0.45,
+    'title': 0.3,
+    'artist': 0.15,
+    'channel': 0.1,
+}
+
+OFFICIAL_CHANNEL_SUFFIXES = (' - topic', 'vevo')
+UNWANTED_KEYWORDS = {
+    'live': 0.3,
+    'cover': 0.3,
+    'karaoke': 0.4,
+    'instrumental': 0.3,
+    'remix': 0.25,
+    'nightcore': 0.4,
+    'sped': 0.3,
+    'slowed': 0.3,
+    'reverb': 0.2,
+    '8d': 0.3,
+    'reaction': 0.4,
+    'loop': 0.3,
+    'hour': 0.3,
+    'hours': 0.3,
+    'lyrics': 0.05,
+}
+
+def parse_duration(value: Union[str, int, float, None]) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        seconds = 0
+        for part in value.strip().split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+def tokenize(text: str) -> set:
+    return set(re.findall(r'\w+', text.lower()))
+
+def _overlap(expected: set, actual: set) -> float:
+    if not expected:
+        return 0.0
+    return len(expected & actual) / len(expected)
+
+def score_candidate(candidate: Dict[str, Any], artist: str, title: str, duration_ms: Optional[int]) -> Dict[str, float]:
+    candidate_title = tokenize(candidate.get('title') or '')
+    channel = (candidate.get('channel') or '').lower()
+    artist_tokens = tokenize(artist)
+    title_tokens = tokenize(title)
+    breakdown = {
+        'title': _overlap(title_tokens, candidate_title),
+        'artist': max(_overlap(artist_tokens, candidate_title), _overlap(artist_tokens, tokenize(channel))),
+        'channel': 1.0 if channel.endswith(OFFICIAL_CHANNEL_SUFFIXES) else 0.0,
+    }
+    duration = candidate.get('duration')
+    if duration_ms and duration is not None:
+        difference = abs(duration - duration_ms / 1000)
+        breakdown['duration'] = max(0.0, 1 - max(0.0, difference - 2) / DURATION_TOLERANCE)
+    else:
+        breakdown['duration'] = 0.0
+    penalty = sum(
+        weight for keyword, weight in UNWANTED_KEYWORDS.items()
+        if keyword in candidate_title and keyword not in title_tokens
+    )
+    breakdown['penalty'] = -penalty
+    breakdown['score'] = sum(WEIGHTS[name] * breakdown[name] for name in WEIGHTS) - penalty
+    return breakdown
+
+def is_plausible_duration(candidate: Dict[str, Any], duration_ms: Optional[int]) -> bool:
+    duration = candidate.get('duration')
+    if not duration_ms or duration is None:
+        return True
+    expected = duration_ms / 1000
+    return duration <= max(expected * MAX_DURATION_RATIO, expected + MIN_DURATION_SLACK)
+
+def rank_candidates(candidates: List[Dict[str, Any]], artist: str, title: str,
+                    duration_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+    ranked = []
+    for candidate in candidates:
+        if not is_plausible_duration(candidate, duration_ms):
+            continue
+        scores = score_candidate(candidate, artist, title, duration_ms)
+        ranked.append(dict(candidate, score=scores.pop('score'), scores=scores))
+    ranked.sort(key=lambda candidate: candidate['score'], reverse=True)
+    return ranked
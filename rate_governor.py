@@ -0,0 +1,245 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from config import (
+    SPOTIFY_RATE_LIMIT, YOUTUBE_RATE_LIMIT, TELEGRAM_RATE_LIMIT, RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_RESET
+)
+from utils import logger
+import metrics
+
+THROTTLED = 'throttled'
+TRANSIENT = 'transient'
+YOUTUBE_THROTTLE_MARKERS = ('http error 429', 'too many requests', 'rate-limited', 'rate limited')
+YOUTUBE_TRANSIENT_MARKERS = (
+    'timed out', 'connection reset', 'connection aborted', 'temporary failure', 'http error 500', 'http error 502',
+    'http error 503', 'http error 504', 'incompleteread', 'unable to download webpage'
+)
+
+Classification = Optional[Tuple[str, float]]
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream} is unavailable after repeated failures, retry in {retry_in:.0f}s")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+    def __reduce__(self):
+        return CircuitOpenError, (self.upstream, self.retry_in)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * 2)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.max_rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def slow_down(self) -> None:
+        if self.max_rate > 0:
+            with self.lock:
+                self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def speed_up(self) -> None:
+        if self.max_rate > 0 and self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = CIRCUIT_BREAKER_THRESHOLD, reset_after: float = CIRCUIT_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def admit(self) -> Tuple[float, bool]:
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0, False
+            remaining = self.opened_at + self.reset_after - time.monotonic()
+            if remaining > 0 or self.probing:
+                return max(remaining, 1.0), False
+            self.probing = True
+            return 0.0, True
+
+    def end_probe(self) -> None:
+        with self.lock:
+            if self.probing:
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def remaining(self) -> float:
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.opened_at + self.reset_after - time.monotonic()
+            return max(remaining, 1.0) if remaining > 0 or self.probing else 0.0
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> bool:
+        with self.lock:
+            self.failures += 1
+            if self.threshold <= 0 or (not self.probing and self.failures < self.threshold):
+                return False
+            self.opened_at = time.monotonic()
+            self.probing = False
+            return True
+
+class Upstream:
+    def __init__(self, name: str, label: str, rate: float, classify: Callable[[Exception], Classification],
+                 attempts: int = RETRY_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.name = name
+        self.label = label
+        self.bucket = TokenBucket(rate)
+        self.breaker = CircuitBreaker()
+        self.classify = classify
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _admit(self) -> Tuple[float, bool]:
+        retry_in, probe = self.breaker.admit()
+        if retry_in:
+            metrics.upstream_rejections.inc(upstream=self.name)
+            raise CircuitOpenError(self.name, retry_in)
+        return self.bucket.reserve(), probe
+
+    def _backoff(self, stage: str, attempt: int, attempts: int, error: Exception, idempotent: bool) -> float:
+        classification = self.classify(error)
+        if classification is None:
+            self.breaker.record_success()
+            raise error
+        kind, retry_after = classification
+        if kind == THROTTLED:
+            self.bucket.slow_down()
+            if retry_after:
+                self.bucket.pause(retry_after)
+        if not retry_after and self.breaker.record_failure():
+            logger.warning(f"Circuit for {self.name} opened for {self.breaker.reset_after}s after repeated failures")
+        if attempt + 1 >= attempts or (kind == TRANSIENT and not idempotent) or retry_after > self.max_delay:
+            raise error
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = max(retry_after, ceiling / 2 + random.uniform(0, ceiling / 2))
+        metrics.upstream_retries.inc(upstream=self.name, stage=stage)
+        logger.warning(f"{self.name} {kind} during {stage} ({error}), retrying in {delay:.1f}s")
+        return delay
+
+    def _succeeded(self) -> None:
+        self.breaker.record_success()
+        self.bucket.speed_up()
+
+    def call(self, stage: str, fn: Callable[..., Any], *args, attempts: Optional[int] = None,
+             idempotent: bool = True, **kwargs) -> Any:
+        attempts = attempts or self.attempts
+        for attempt in range(attempts):
+            wait, probe = self._admit()
+            try:
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._backoff(stage, attempt, attempts, e, idempotent)
+                else:
+                    self._succeeded()
+                    return result
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            time.sleep(delay)
+
+    async def call_async(self, stage: str, fn: Callable[..., Any], *args, attempts: Optional[int] = None,
+                         idempotent: bool = True, **kwargs) -> Any:
+        attempts = attempts or self.attempts
+        for attempt in range(attempts):
+            wait, probe = self._admit()
+            try:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._backoff(stage, attempt, attempts, e, idempotent)
+                else:
+                    self._succeeded()
+                    return result
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            await asyncio.sleep(delay)
+
+def classify_spotify(error: Exception) -> Classification:
+    status = getattr(error, 'http_status', None)
+    if status == 429:
+        headers = getattr(error, 'headers', None) or {}
+        try:
+            return THROTTLED, float(headers.get('Retry-After', 0))
+        except ValueError:
+            return THROTTLED, 0.0
+    if status is not None and status >= 500:
+        return TRANSIENT, 0.0
+    if status is None and isinstance(error, OSError):
+        return TRANSIENT, 0.0
+    return None
+
+def classify_youtube(error: Exception) -> Classification:
+    message = str(error).lower()
+    if any(marker in message for marker in YOUTUBE_THROTTLE_MARKERS):
+        return THROTTLED, 0.0
+    if any(marker in message for marker in YOUTUBE_TRANSIENT_MARKERS):
+        return TRANSIENT, 0.0
+    return None
+
+def classify_telegram(error: Exception) -> Classification:
+    if isinstance(error, RetryAfter):
+        return THROTTLED, float(error.retry_after)
+    if isinstance(error, (BadRequest, Forbidden)):
+        return None
+    if isinstance(error, NetworkError):
+        return TRANSIENT, 0.0
+    return None
+
+spotify = Upstream('spotify', 'Spotify', SPOTIFY_RATE_LIMIT, classify_spotify)
+youtube = Upstream('youtube', 'YouTube', YOUTUBE_RATE_LIMIT, classify_youtube)
+telegram = Upstream('telegram', 'Telegram', TELEGRAM_RATE_LIMIT, classify_telegram)
+upstreams: Dict[str, Upstream] = {upstream.name: upstream for upstream in (spotify, youtube, telegram)}
+
+def ensure_available(*names: str) -> None:
+    for name in names:
+        retry_in = upstreams[name].breaker.remaining()
+        if retry_in:
+            metrics.upstream_rejections.inc(upstream=name)
+            raise CircuitOpenError(name, retry_in)
+
+def stats() -> Dict[str, Dict[str, float]]:
+    return {
+        name: {'rate': upstream.bucket.rate, 'open': 1 if upstream.breaker.remaining() else 0}
+        for name, upstream in upstreams.items()
+    }
\ No newline at end of file
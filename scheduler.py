@@ -0,0 +1,113 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from config import MAX_CONCURRENT_DOWNLOADS
+from utils import logger
+
+PositionCallback = Callable[[int], Awaitable[Any]]
+
+class _Entry:
+    def __init__(self, user_id: Hashable, factory: Callable[[], Awaitable[Any]], on_position: Optional[PositionCallback]):
+        self.user_id = user_id
+        self.factory = factory
+        self.on_position = on_position
+        self.future = asyncio.get_running_loop().create_future()
+        self.position = None
+
+class JobScheduler:
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_DOWNLOADS):
+        self.max_concurrent = max_concurrent
+        self.running = 0
+        self.queues: 'OrderedDict[Hashable, deque]' = OrderedDict()
+        self._tasks = set()
+
+    def submit(self, user_id: Hashable, factory: Callable[[], Awaitable[Any]],
+               on_position: Optional[PositionCallback] = None) -> asyncio.Future:
+        entry = _Entry(user_id, factory, on_position)
+        self.queues.setdefault(user_id, deque()).append(entry)
+        self._dispatch()
+        self._notify_positions()
+        return entry.future
+
+    def queued_count(self, user_id: Optional[Hashable] = None) -> int:
+        if user_id is not None:
+            return len(self.queues.get(user_id, ()))
+        return sum(len(queue) for queue in self.queues.values())
+
+    def is_idle(self) -> bool:
+        return self.running < self.max_concurrent and not self.queues
+
+    def _next_entry(self) -> Optional[_Entry]:
+        while self.queues:
+            user_id, queue = next(iter(self.queues.items()))
+            entry = queue.popleft()
+            if queue:
+                self.queues.move_to_end(user_id)
+            else:
+                del self.queues[user_id]
+            if not entry.future.done():
+                return entry
+        return None
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_concurrent:
+            entry = self._next_entry()
+            if entry is None:
+                return
+            self.running += 1
+            self._spawn(self._run(entry))
+
+    async def _run(self, entry: _Entry) -> None:
+        self._report(entry, 0)
+        try:
+            result = await entry.factory()
+            if not entry.future.done():
+                entry.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Scheduled job for user {entry.user_id} failed: {e}")
+            if not entry.future.done():
+                entry.future.set_exception(e)
+        finally:
+            self.running -= 1
+            self._dispatch()
+            self._notify_positions()
+
+    def _dispatch_order(self):
+        queues = [list(queue) for queue in self.queues.values()]
+        depth = 0
+        while True:
+            row = [queue[depth] for queue in queues if depth < len(queue)]
+            if not row:
+                return
+            yield from row
+            depth += 1
+
+    def _notify_positions(self) -> None:
+        for position, entry in enumerate(self._dispatch_order(), start=1):
+            self._report(entry, position)
+
+    def _report(self, entry: _Entry, position: int) -> None:
+        if entry.position == position:
+            return
+        entry.position = position
+        if entry.on_position:
+            self._spawn(self._call_position(entry, position))
+
+    async def _call_position(self, entry: _Entry, position: int) -> None:
+        try:
+            await entry.on_position(position)
+        except Exception as e:
+            logger.warning(f"Could not report queue position to user {entry.user_id}: {e}")
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'running': self.running,
+            'queued': self.queued_count(),
+            'users': len(self.queues),
+            'limit': self.max_concurrent,
+        }
\ No newline at end of file
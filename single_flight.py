@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from utils import logger
+
+class _Flight:
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.refs = 0
+        self.lock = asyncio.Lock()
+
+class SingleFlight:
+    def __init__(self, cleanup: Optional[Callable[[Any], None]] = None):
+        self.cleanup = cleanup
+        self.flights: Dict[Hashable, _Flight] = {}
+
+    def is_inflight(self, key: Hashable) -> bool:
+        return key in self.flights
+
+    @asynccontextmanager
+    async def lease(self, key: Hashable, factory: Callable[[], Awaitable[Any]]):
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self.flights[key] = flight
+        else:
+            logger.info(f"Joining in-flight download for {key} ({flight.refs} waiting)")
+        flight.refs += 1
+        try:
+            yield await asyncio.shield(flight.future)
+        finally:
+            self._release(key, flight)
+
+    @asynccontextmanager
+    async def exclusive(self, key: Hashable):
+        flight = self.flights.get(key)
+        if flight is None:
+            yield
+            return
+        async with flight.lock:
+            yield
+
+    def _release(self, key: Hashable, flight: _Flight) -> None:
+        flight.refs -= 1
+        if flight.refs > 0:
+            return
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if flight.future.done():
+            self._cleanup(flight.future)
+        else:
+            flight.future.add_done_callback(self._cleanup)
+
+    def _cleanup(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if result and self.cleanup:
+            self.cleanup(result)
\ No newline at end of file
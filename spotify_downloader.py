@@ -1,17 +1,37 @@
 import os
+import time
 import logging
+import zlib
+from contextlib import contextmanager
+import requests
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
-from youtubesearchpython import VideosSearch
 import yt_dlp
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+from mutagen import File as MutagenFile
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3, TIT2, TPE1, TALB, APIC
-import requests
-from typing import Optional, Dict, Any, Tuple
-from PIL import Image
-import io
-from config import SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, DOWNLOAD_PATH, AUDIO_QUALITY
-from utils import clean_title, create_search_query, ensure_download_directory, sanitize_filename, format_file_size, logger
+from mutagen.mp4 import MP4, MP4Cover
+from typing import Optional, Dict, Any, List, Tuple, Union, BinaryIO, Callable
+from config import SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, CACHE_PATH, DOWNLOAD_PATH, AUDIO_QUALITY, AUDIO_BITRATES, OUTPUT_FORMAT, MAX_COLLECTION_TRACKS, MAX_FILE_SIZE, MAX_SEARCH_RESULTS, SEARCH_LANGUAGE, PIPELINE_MODE, MEMORY_SCRATCH_PATH
+from utils import clean_title, create_search_query, ensure_download_directory, sanitize_filename, format_file_size, estimate_audio_size, logger
+from audio_cache import AudioCache
+from metadata_cache import MetadataCache, MISSING
+from cover_art import CoverArtCache
+from ranking import parse_duration, rank_candidates
+from audio_buffer import AudioBuffer, MemoryBudget, load_audio_buffer
+import metrics
+import rate_governor
+from rate_governor import CircuitOpenError
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SPOTIFY_TRACKS_BATCH_SIZE = 50
+PASSTHROUGH_EXTENSIONS = ('m4a',)
+TRACK_LOCK_STRIPES = 256
 
 class SpotifyDownloader:
     def __init__(self):
@@ -19,67 +39,323 @@ class SpotifyDownloader:
             client_credentials_manager=SpotifyClientCredentials(
                 client_id=SPOTIPY_CLIENT_ID,
                 client_secret=SPOTIPY_CLIENT_SECRET
-            )
+            ),
+            requests_session=requests.Session()
         )
         ensure_download_directory(DOWNLOAD_PATH)
+        self.memory_budget = MemoryBudget() if PIPELINE_MODE == 'memory' else None
+        self.work_path = MEMORY_SCRATCH_PATH if self.memory_budget else DOWNLOAD_PATH
+        ensure_download_directory(self.work_path)
+        self.lock_path = os.path.join(CACHE_PATH, 'locks')
+        ensure_download_directory(self.lock_path)
+        self.audio_cache = AudioCache()
+        self.metadata_cache = MetadataCache()
+        self.cover_art = CoverArtCache()
         self.cookiefile = 'cookies.txt' if os.path.exists('cookies.txt') else None
 
+    def _parse_track(self, track: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': track['id'],
+            'name': track['name'],
+            'artist': track['artists'][0]['name'] if track['artists'] else 'Unknown Artist',
+            'album': track['album']['name'],
+            'album_id': track['album'].get('id'),
+            'duration_ms': track['duration_ms'],
+            'album_art_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
+            'release_date': track['album']['release_date'],
+            'popularity': track['popularity']
+        }
+
     def get_track_info(self, track_id: str) -> Optional[Dict[str, Any]]:
+        cached = self.metadata_cache.get('spotify', track_id)
+        if cached is not MISSING:
+            return cached
         try:
-            track = self.spotify.track(track_id)
-            track_info = {
-                'id': track['id'],
-                'name': track['name'],
-                'artist': track['artists'][0]['name'] if track['artists'] else 'Unknown Artist',
-                'album': track['album']['name'],
-                'duration_ms': track['duration_ms'],
-                'album_art_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                'release_date': track['album']['release_date'],
-                'popularity': track['popularity']
-            }
+            with metrics.span('spotify'):
+                track = rate_governor.spotify.call('metadata', self.spotify.track, track_id)
+            track_info = self._parse_track(track)
+            self.metadata_cache.set('spotify', track_id, track_info)
             logger.info(f"Retrieved track info: {track_info['artist']} - {track_info['name']}")
             return track_info
+        except spotipy.SpotifyException as e:
+            logger.error(f"Error getting track info: {e}")
+            if e.http_status in (400, 404):
+                self.metadata_cache.set('spotify', track_id, None)
+            return None
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Error getting track info: {e}")
             return None
 
-    def search_youtube(self, artist: str, title: str) -> Optional[str]:
+    def search_track_id(self, query: str) -> Optional[str]:
+        cache_key = ' '.join(query.lower().split())
+        cached = self.metadata_cache.get('spotify_search', cache_key)
+        if cached is not MISSING:
+            return cached
+        try:
+            with metrics.span('spotify'):
+                results = rate_governor.spotify.call('search', self.spotify.search, q=query, type='track', limit=1)
+        except Exception as e:
+            logger.error(f"Error searching Spotify for {query}: {e}")
+            return None
+        items = results['tracks']['items']
+        track_id = items[0]['id'] if items else None
+        if track_id:
+            self.metadata_cache.set('spotify', track_id, self._parse_track(items[0]))
+        self.metadata_cache.set('spotify_search', cache_key, track_id)
+        return track_id
+
+    def get_tracks_info(self, track_ids: List[str]) -> List[Dict[str, Any]]:
+        found = {}
+        missing = []
+        for track_id in track_ids:
+            cached = self.metadata_cache.get('spotify', track_id)
+            if cached is MISSING:
+                missing.append(track_id)
+            elif cached:
+                found[track_id] = cached
+        for start in range(0, len(missing), SPOTIFY_TRACKS_BATCH_SIZE):
+            batch = missing[start:start + SPOTIFY_TRACKS_BATCH_SIZE]
+            try:
+                with metrics.span('spotify'):
+                    tracks = rate_governor.spotify.call('metadata', self.spotify.tracks, batch)['tracks']
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                logger.error(f"Error getting tracks info: {e}")
+                continue
+            for track_id, track in zip(batch, tracks):
+                track_info = self._parse_track(track) if track else None
+                self.metadata_cache.set('spotify', track_id, track_info)
+                if track_info:
+                    found[track_id] = track_info
+        tracks_info = [found[track_id] for track_id in track_ids if track_id in found]
+        logger.info(
+            f"Retrieved info for {len(tracks_info)}/{len(track_ids)} tracks "
+            f"({len(track_ids) - len(missing)} from cache)"
+        )
+        return tracks_info
+
+    def _collect_track_ids(self, page: Dict[str, Any], track_ids: List[str]) -> None:
+        while page:
+            for item in page['items']:
+                track = item.get('track', item) if item else None
+                if track and track.get('id') and track.get('type', 'track') == 'track':
+                    track_ids.append(track['id'])
+            if len(track_ids) >= MAX_COLLECTION_TRACKS or not page.get('next'):
+                return
+            page = rate_governor.spotify.call('collection', self.spotify.next, page)
+
+    def get_collection_info(self, content_type: str, content_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            track_ids = []
+            with metrics.span('spotify'):
+                if content_type == 'album':
+                    album = rate_governor.spotify.call('collection', self.spotify.album, content_id)
+                    name = album['name']
+                    self._collect_track_ids(album['tracks'], track_ids)
+                elif content_type == 'playlist':
+                    playlist = rate_governor.spotify.call(
+                        'collection', self.spotify.playlist, content_id,
+                        fields='name,tracks.next,tracks.items(track(id,type))',
+                        additional_types=('track',)
+                    )
+                    name = playlist['name']
+                    self._collect_track_ids(playlist['tracks'], track_ids)
+                else:
+                    logger.error(f"Unsupported collection type: {content_type}")
+                    return None
+            track_ids = list(dict.fromkeys(track_ids))[:MAX_COLLECTION_TRACKS]
+            logger.info(f"Retrieved {content_type} {name} with {len(track_ids)} tracks")
+            return {
+                'type': content_type,
+                'id': content_id,
+                'name': name,
+                'tracks': self.get_tracks_info(track_ids)
+            }
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting {content_type} info: {e}")
+            return None
+
+    def get_batch_info(self, links: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        self.get_tracks_info([content_id for content_type, content_id in links if content_type == 'track'])
+        tracks = {}
+        for content_type, content_id in links:
+            if content_type == 'track':
+                track_info = self.get_track_info(content_id)
+                found = [track_info] if track_info else []
+            else:
+                collection = self.get_collection_info(content_type, content_id)
+                found = collection['tracks'] if collection else []
+            for track_info in found:
+                tracks.setdefault(track_info['id'], track_info)
+        return list(tracks.values())[:MAX_COLLECTION_TRACKS]
+
+    def warm_up(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.spotify.auth_manager.get_access_token(as_dict=False)
+        except Exception as e:
+            logger.warning(f"Could not fetch Spotify token during warm-up: {e}")
+        try:
+            with yt_dlp.YoutubeDL(self._ydl_options()) as ydl:
+                ydl.get_info_extractor('Youtube')
+                ydl.get_info_extractor('YoutubeSearch')
+        except Exception as e:
+            logger.warning(f"Could not initialize yt-dlp during warm-up: {e}")
+        logger.info(f"Downloader warmed up in {time.perf_counter() - started:.2f}s")
+
+    def _ydl_options(self, **options) -> Dict[str, Any]:
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+        }
+        if self.cookiefile:
+            ydl_opts['cookiefile'] = self.cookiefile
+        ydl_opts.update(options)
+        return ydl_opts
+
+    def search_youtube_candidates(self, artist: str, title: str, duration_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        search_query = create_search_query(artist, title)
+        logger.info(f"Searching YouTube for: {search_query}")
+        ydl_opts = self._ydl_options(
+            extract_flat='in_playlist',
+            extractor_args={'youtube': {'lang': [SEARCH_LANGUAGE]}}
+        )
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            results = rate_governor.youtube.call(
+                'youtube_search', ydl.extract_info, f"ytsearch{MAX_SEARCH_RESULTS}:{search_query}", download=False
+            ) or {}
+        candidates = [
+            {
+                'id': entry['id'],
+                'title': entry.get('title'),
+                'channel': entry.get('channel') or entry.get('uploader'),
+                'duration': parse_duration(entry.get('duration')),
+            }
+            for entry in results.get('entries') or [] if entry and entry.get('id')
+        ]
+        ranked = rank_candidates(candidates, artist, title, duration_ms)
+        for candidate in ranked:
+            logger.debug(
+                f"YouTube candidate {candidate['score']:.2f} {candidate['title']} "
+                f"[{candidate['channel']}] {candidate['scores']}"
+            )
+        return ranked
+
+    def search_youtube(self, artist: str, title: str, duration_ms: Optional[int] = None) -> Optional[str]:
         try:
             search_query = create_search_query(artist, title)
-            logger.info(f"Searching YouTube for: {search_query}")
-            videos_search = VideosSearch(search_query, limit=5)
-            results = videos_search.result()
-            if not results or not results.get('result'):
-                logger.warning("No YouTube results found")
+            cache_key = f"{search_query}|{duration_ms}" if duration_ms else search_query
+            cached = self.metadata_cache.get('youtube', cache_key)
+            if cached is not MISSING:
+                logger.info(f"YouTube search cache hit for: {search_query}")
+                return cached
+            with metrics.span('youtube_search') as stage:
+                ranked = self.search_youtube_candidates(artist, title, duration_ms)
+                if not ranked:
+                    stage.fail()
+            if not ranked:
+                logger.warning("No matching YouTube results found")
+                self.metadata_cache.set('youtube', cache_key, None)
                 return None
-            video = results['result'][0]
+            video = ranked[0]
             video_url = f"https://www.youtube.com/watch?v={video['id']}"
-            logger.info(f"Found YouTube video: {video['title']}")
+            self.metadata_cache.set('youtube', cache_key, video_url)
+            logger.info(f"Found YouTube video: {video['title']} (score {video['score']:.2f})")
             return video_url
         except Exception as e:
             logger.error(f"Error searching YouTube: {e}")
             return None
 
-    def download_audio(self, youtube_url: str, output_filename: str) -> Optional[str]:
+    def audio_cache_key(self, track_info: Dict[str, Any], bitrate: str) -> str:
+        variant = bitrate if OUTPUT_FORMAT == 'mp3' else f"{OUTPUT_FORMAT}-{bitrate}"
+        return AudioCache.make_key(track_info['id'], variant)
+
+    def is_audio_cached(self, track_info: Dict[str, Any]) -> bool:
+        bitrate = self.select_bitrate(track_info)
+        return bool(bitrate) and self.audio_cache.contains(self.audio_cache_key(track_info, bitrate))
+
+    def select_bitrate(self, track_info: Dict[str, Any]) -> Optional[str]:
+        max_kbps = int(AUDIO_QUALITY.rstrip('k'))
+        for bitrate in AUDIO_BITRATES:
+            if int(bitrate.rstrip('k')) > max_kbps:
+                continue
+            if estimate_audio_size(track_info['duration_ms'], bitrate) <= MAX_FILE_SIZE:
+                if bitrate != AUDIO_QUALITY:
+                    logger.info(f"Lowering bitrate to {bitrate} to fit {track_info['name']} under the file size limit")
+                return bitrate
+        return None
+
+    def _add_timing_hooks(self, ydl: yt_dlp.YoutubeDL) -> None:
+        started = {'download': time.perf_counter()}
+
+        def on_progress(status: Dict[str, Any]) -> None:
+            if status['status'] == 'finished':
+                metrics.stage_latency.observe(time.perf_counter() - started['download'], stage='download')
+                metrics.downloaded_bytes.inc(status.get('total_bytes') or status.get('downloaded_bytes') or 0)
+
+        def on_postprocess(status: Dict[str, Any]) -> None:
+            if status.get('postprocessor') != 'ExtractAudio':
+                return
+            if status['status'] == 'started':
+                started['ffmpeg'] = time.perf_counter()
+            elif status['status'] == 'finished' and 'ffmpeg' in started:
+                metrics.stage_latency.observe(time.perf_counter() - started.pop('ffmpeg'), stage='ffmpeg')
+
+        ydl.add_progress_hook(on_progress)
+        ydl.add_postprocessor_hook(on_postprocess)
+
+    def _add_progress_hook(self, ydl: yt_dlp.YoutubeDL, progress: Callable[[int], None]) -> None:
+        last_percent = {'value': -1}
+
+        def on_progress(status: Dict[str, Any]) -> None:
+            total = status.get('total_bytes') or status.get('total_bytes_estimate')
+            if status['status'] != 'downloading' or not total:
+                return
+            percent = min(100, int(status.get('downloaded_bytes', 0) * 100 / total))
+            if percent != last_percent['value']:
+                last_percent['value'] = percent
+                progress(percent)
+
+        ydl.add_progress_hook(on_progress)
+
+    def download_audio(self, youtube_url: str, output_filename: str, bitrate: str = AUDIO_QUALITY,
+                       progress: Optional[Callable[[int], None]] = None) -> Optional[str]:
         try:
-            output_path = os.path.join(DOWNLOAD_PATH, f"{output_filename}.mp3")
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': output_path.replace('.mp3', '.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': AUDIO_QUALITY,
-                }],
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-            }
-            if self.cookiefile:
-                ydl_opts['cookiefile'] = self.cookiefile
+            passthrough = OUTPUT_FORMAT == 'auto'
+            ydl_opts = self._ydl_options(
+                format='bestaudio[ext=m4a]/bestaudio/best' if passthrough else 'bestaudio/best',
+                outtmpl=os.path.join(self.work_path, f"{output_filename}.%(ext)s"),
+                extract_flat=False,
+                continuedl=True
+            )
             logger.info(f"Downloading audio from: {youtube_url}")
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
+                with metrics.span('youtube_extract'):
+                    info = rate_governor.youtube.call('youtube_extract', ydl.extract_info, youtube_url, download=False)
+                native_size = info.get('filesize') or info.get('filesize_approx')
+                if native_size:
+                    logger.info(f"Selected {info.get('ext')} stream ({format_file_size(native_size)}) before download")
+                if passthrough and info.get('ext') in PASSTHROUGH_EXTENSIONS and (not native_size or native_size <= MAX_FILE_SIZE):
+                    extension = info['ext']
+                    logger.info(f"Keeping native {info.get('acodec')} stream without transcoding")
+                else:
+                    extension = 'mp3'
+                    ydl.add_post_processor(FFmpegExtractAudioPP(
+                        ydl, preferredcodec='mp3', preferredquality=bitrate.rstrip('k')
+                    ))
+                if metrics.enabled:
+                    self._add_timing_hooks(ydl)
+                if progress:
+                    self._add_progress_hook(ydl, progress)
+                with metrics.span('youtube_download'):
+                    rate_governor.youtube.call('youtube_download', ydl.process_ie_result, info, download=True)
+            output_path = os.path.join(self.work_path, f"{output_filename}.{extension}")
             if os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
                 logger.info(f"Downloaded: {output_filename} ({format_file_size(file_size)})")
@@ -91,39 +367,84 @@ class SpotifyDownloader:
             logger.error(f"Error downloading audio: {e}")
             return None
 
-    def add_metadata(self, file_path: str, track_info: Dict[str, Any]) -> bool:
+    def add_metadata(self, file_path: Union[str, AudioBuffer], track_info: Dict[str, Any]) -> bool:
         try:
-            audio = MP3(file_path)
-            if audio.tags is None:
-                audio.tags = ID3()
-            audio.tags.add(TIT2(encoding=3, text=track_info['name']))
-            audio.tags.add(TPE1(encoding=3, text=track_info['artist']))
-            audio.tags.add(TALB(encoding=3, text=track_info['album']))
+            cover = None
             if track_info.get('album_art_url'):
-                try:
-                    response = requests.get(track_info['album_art_url'])
-                    if response.status_code == 200:
-                        img = Image.open(io.BytesIO(response.content))
-                        img_byte_arr = io.BytesIO()
-                        img.save(img_byte_arr, format='JPEG')
-                        img_byte_arr = img_byte_arr.getvalue()
-                        audio.tags.add(APIC(
-                            encoding=3,
-                            mime='image/jpeg',
-                            type=3,
-                            desc='Cover',
-                            data=img_byte_arr
-                        ))
-                        logger.info("Added album art to MP3")
-                except Exception as e:
-                    logger.warning(f"Could not add album art: {e}")
-            audio.save()
+                with metrics.span('cover_art') as stage:
+                    try:
+                        cover = self.cover_art.get(track_info['album_art_url'])
+                    except Exception as e:
+                        stage.fail()
+                        logger.warning(f"Could not add album art: {e}")
+            target = file_path.open() if isinstance(file_path, AudioBuffer) else file_path
+            with metrics.span('tagging'):
+                if self.audio_extension(file_path) == '.m4a':
+                    self._add_mp4_metadata(target, track_info, cover)
+                else:
+                    self._add_id3_metadata(target, track_info, cover)
+            if isinstance(file_path, AudioBuffer):
+                file_path.update(target.getvalue())
             logger.info("Metadata added successfully")
             return True
         except Exception as e:
             logger.error(f"Error adding metadata: {e}")
             return False
 
+    def _add_id3_metadata(self, file_path: Union[str, BinaryIO], track_info: Dict[str, Any], cover: Optional[bytes]) -> None:
+        audio = MP3(file_path)
+        if audio.tags is None:
+            audio.tags = ID3()
+        audio.tags.add(TIT2(encoding=3, text=track_info['name']))
+        audio.tags.add(TPE1(encoding=3, text=track_info['artist']))
+        audio.tags.add(TALB(encoding=3, text=track_info['album']))
+        if cover:
+            audio.tags.add(APIC(
+                encoding=3,
+                mime='image/jpeg',
+                type=3,
+                desc='Cover',
+                data=cover
+            ))
+            logger.info("Added album art to MP3")
+        audio.save(file_path)
+
+    def _add_mp4_metadata(self, file_path: Union[str, BinaryIO], track_info: Dict[str, Any], cover: Optional[bytes]) -> None:
+        audio = MP4(file_path)
+        if audio.tags is None:
+            audio.add_tags()
+        audio.tags['\xa9nam'] = [track_info['name']]
+        audio.tags['\xa9ART'] = [track_info['artist']]
+        audio.tags['\xa9alb'] = [track_info['album']]
+        if cover:
+            audio.tags['covr'] = [MP4Cover(cover, imageformat=MP4Cover.FORMAT_JPEG)]
+            logger.info("Added album art to M4A")
+        audio.save(file_path)
+
+    def describe_audio(self, file_path: Union[str, AudioBuffer]) -> str:
+        try:
+            audio = MutagenFile(file_path.open() if isinstance(file_path, AudioBuffer) else file_path)
+            codec = 'AAC' if isinstance(audio, MP4) else 'MP3'
+            return f"{round(audio.info.bitrate / 1000)}kbps {codec}"
+        except Exception as e:
+            logger.warning(f"Could not read audio info: {e}")
+            return self.audio_extension(file_path).lstrip('.').upper()
+
+    def audio_extension(self, file_path: Union[str, AudioBuffer]) -> str:
+        if isinstance(file_path, AudioBuffer):
+            return file_path.extension
+        return os.path.splitext(file_path)[1].lower()
+
+    def audio_size(self, file_path: Union[str, AudioBuffer]) -> int:
+        if isinstance(file_path, AudioBuffer):
+            return file_path.size
+        return os.path.getsize(file_path)
+
+    def open_audio(self, file_path: Union[str, AudioBuffer]) -> BinaryIO:
+        if isinstance(file_path, AudioBuffer):
+            return file_path.open()
+        return open(file_path, 'rb')
+
     def download_track(self, spotify_url: str) -> Optional[Tuple[str, Dict[str, Any]]]:
         try:
             from utils import extract_spotify_id
@@ -135,21 +456,82 @@ class SpotifyDownloader:
             track_info = self.get_track_info(track_id)
             if not track_info:
                 return None
-            youtube_url = self.search_youtube(track_info['artist'], track_info['name'])
-            if not youtube_url:
-                return None
-            filename = sanitize_filename(f"{track_info['artist']} - {track_info['name']}")
-            file_path = self.download_audio(youtube_url, filename)
-            if not file_path:
-                return None
-            self.add_metadata(file_path, track_info)
-            return file_path, track_info
+            return self.download_track_info(track_info)
         except Exception as e:
             logger.error(f"Error in download_track: {e}")
             return None
 
-    def cleanup_file(self, file_path: str) -> None:
+    def download_track_info(self, track_info: Dict[str, Any],
+                            progress: Optional[Callable[[int], None]] = None) -> Optional[Tuple[Union[str, AudioBuffer], Dict[str, Any]]]:
+        try:
+            bitrate = self.select_bitrate(track_info)
+            if not bitrate:
+                logger.warning(f"Skipping {track_info['artist']} - {track_info['name']}: too long for the file size limit")
+                return None
+            cache_key = self.audio_cache_key(track_info, bitrate)
+            cached_path = self.audio_cache.get(cache_key)
+            if cached_path:
+                logger.info(f"Audio cache hit: {track_info['artist']} - {track_info['name']}")
+                return cached_path, track_info
+            with self.track_lock(track_info['id']):
+                return self.fetch_track_audio(track_info, bitrate, cache_key, progress)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in download_track_info: {e}")
+            return None
+
+    @contextmanager
+    def track_lock(self, track_id: str):
+        if fcntl is None:
+            yield
+            return
+        stripe = zlib.crc32(track_id.encode()) % TRACK_LOCK_STRIPES
+        with open(os.path.join(self.lock_path, f"{stripe}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch_track_audio(self, track_info: Dict[str, Any], bitrate: str, cache_key: str,
+                          progress: Optional[Callable[[int], None]] = None) -> Optional[Tuple[Union[str, AudioBuffer], Dict[str, Any]]]:
+        cached_path = self.audio_cache.contains(cache_key) and self.audio_cache.get(cache_key)
+        if cached_path:
+            logger.info(f"Audio cache hit after waiting for another download: {track_info['artist']} - {track_info['name']}")
+            return cached_path, track_info
+        rate_governor.ensure_available('youtube')
+        youtube_url = self.search_youtube(track_info['artist'], track_info['name'], track_info['duration_ms'])
+        if not youtube_url:
+            return None
+        filename = sanitize_filename(f"{track_info['artist']} - {track_info['name']}")
+        file_path = self.download_audio(youtube_url, filename, bitrate, progress)
+        if not file_path:
+            return None
+        if self.memory_budget:
+            audio_buffer = load_audio_buffer(file_path, self.memory_budget)
+            if audio_buffer:
+                self.add_metadata(audio_buffer, track_info)
+                with metrics.span('cache_store'):
+                    self.audio_cache.store_bytes(cache_key, audio_buffer.data, audio_buffer.extension)
+                return audio_buffer, track_info
+        self.add_metadata(file_path, track_info)
+        with metrics.span('cache_store'):
+            file_path = self.audio_cache.store(cache_key, file_path)
+        if not self.audio_cache.owns(file_path):
+            base, extension = os.path.splitext(file_path)
+            private_path = f"{base}.{os.getpid()}{extension}"
+            os.replace(file_path, private_path)
+            file_path = private_path
+        return file_path, track_info
+
+    def cleanup_file(self, file_path: Union[str, AudioBuffer]) -> None:
         try:
+            if isinstance(file_path, AudioBuffer):
+                file_path.release()
+                return
+            if self.audio_cache.enabled and self.audio_cache.owns(file_path):
+                return
             if os.path.exists(file_path):
                 os.remove(file_path)
                 logger.info(f"Cleaned up file: {file_path}")
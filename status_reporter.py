@@ -0,0 +1,65 @@
+import asyncio
+import time
+from typing import Optional, Set
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
+from config import STATUS_UPDATE_INTERVAL
+from utils import logger
+import rate_governor
+
+_running_tasks: Set[asyncio.Task] = set()
+
+class StatusReporter:
+    def __init__(self, message, interval: float = STATUS_UPDATE_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self.pending: Optional[str] = None
+        self.current: Optional[str] = None
+        self.next_edit_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.edits = 0
+        self.dropped = 0
+
+    def update(self, text: str) -> None:
+        if self.message is None:
+            return
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = text
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._flush())
+            _running_tasks.add(self.task)
+            self.task.add_done_callback(_running_tasks.discard)
+
+    async def wait(self) -> None:
+        while self.task and not self.task.done():
+            await asyncio.shield(self.task)
+
+    async def _flush(self) -> None:
+        while self.pending is not None:
+            delay = self.next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text, self.pending = self.pending, None
+            if text == self.current:
+                continue
+            try:
+                await rate_governor.telegram.call_async(
+                    'status', self.message.edit_text, text, parse_mode=ParseMode.MARKDOWN, attempts=1
+                )
+                self.current = text
+                self.edits += 1
+            except RetryAfter as e:
+                logger.warning(f"Status updates throttled by Telegram for {e.retry_after}s")
+                if self.pending is None:
+                    self.pending = text
+                self.next_edit_at = time.monotonic() + e.retry_after
+                continue
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    self.current = text
+                else:
+                    logger.warning(f"Could not update status message: {e}")
+            except Exception as e:
+                logger.warning(f"Could not update status message: {e}")
+            self.next_edit_at = time.monotonic() + self.interval
\ No newline at end of file
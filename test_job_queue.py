@@ -0,0 +1,49 @@
+import os
+import socket
+import time
+import job_queue
+from job_queue import JobQueue
+
+def make_queue(tmp_path, lease_seconds=600):
+    return JobQueue(str(tmp_path / 'jobs.sqlite3'), lease_seconds=lease_seconds)
+
+def test_claims_round_robin_between_users(tmp_path):
+    queue = make_queue(tmp_path)
+    for index in range(3):
+        queue.enqueue(1, 1, f"https://open.spotify.com/album/a{index}")
+    queue.enqueue(2, 2, 'https://open.spotify.com/track/t1')
+    claimed = [queue.claim('worker')['user_id'] for _ in range(3)]
+    assert claimed == [1, 2, 1]
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    job_id = queue.enqueue(1, 1, 'https://open.spotify.com/track/t1')
+    assert queue.claim('first')['id'] == job_id
+    assert queue.claim('second') is None
+    time.sleep(0.1)
+    job = queue.claim('second')
+    assert (job['id'], job['worker'], job['attempts']) == (job_id, 'second', 2)
+    assert not queue.heartbeat(job_id, 'first')
+
+def test_recover_requeues_jobs_of_dead_processes_on_this_host(tmp_path, monkeypatch):
+    queue = make_queue(tmp_path)
+    host = socket.gethostname()
+    job_ids = [queue.enqueue(1, 1, f"https://open.spotify.com/track/t{index}") for index in range(4)]
+    for _ in job_ids:
+        queue.claim('old')
+    dead_pid, live_pid = 999999, 1
+    for job_id, job_host, pid in zip(job_ids, (host, host, f"{host}_2", host), (dead_pid, live_pid, dead_pid, os.getpid())):
+        queue.conn.execute("UPDATE jobs SET host = ?, pid = ? WHERE id = ?", (job_host, pid, job_id))
+    monkeypatch.setattr(job_queue, '_process_alive', lambda pid: pid != dead_pid)
+    assert queue.recover(host, 'new') == 2
+    states = {job_id: queue.get(job_id)['state'] for job_id in job_ids}
+    assert states == dict(zip(job_ids, ('queued', 'running', 'running', 'queued')))
+
+def test_release_restores_attempts(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue(1, 1, 'https://open.spotify.com/track/t1')
+    queue.claim('worker')
+    queue.release(job_id, 'worker')
+    job = queue.get(job_id)
+    assert (job['state'], job['attempts'], job['worker']) == ('queued', 0, None)
+    assert queue.claim('worker')['attempts'] == 1
\ No newline at end of file
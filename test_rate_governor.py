@@ -0,0 +1,65 @@
+import asyncio
+import pickle
+import time
+import pytest
+import spotipy
+import rate_governor
+from rate_governor import CircuitBreaker, CircuitOpenError, Upstream, classify_spotify
+
+def make_upstream():
+    upstream = Upstream('test', 'Test', 0, classify_spotify, attempts=1, base_delay=0.01)
+    upstream.breaker = CircuitBreaker(threshold=2, reset_after=0.2)
+    return upstream
+
+def throttled():
+    raise spotipy.SpotifyException(429, -1, 'throttled', headers={'Retry-After': '0.01'})
+
+def unavailable():
+    raise spotipy.SpotifyException(503, -1, 'unavailable')
+
+def open_circuit(upstream):
+    for _ in range(2):
+        with pytest.raises(spotipy.SpotifyException):
+            upstream.call('test', unavailable)
+    with pytest.raises(CircuitOpenError):
+        upstream.call('test', lambda: 'ok')
+
+def test_throttled_probe_reopens_and_recovers():
+    upstream = make_upstream()
+    open_circuit(upstream)
+    time.sleep(0.25)
+    with pytest.raises(spotipy.SpotifyException):
+        upstream.call('test', throttled)
+    assert not upstream.breaker.probing
+    with pytest.raises(CircuitOpenError):
+        upstream.call('test', lambda: 'ok')
+    time.sleep(0.25)
+    assert upstream.call('test', lambda: 'ok') == 'ok'
+    assert upstream.breaker.remaining() == 0
+
+def test_cancelled_probe_is_settled():
+    upstream = make_upstream()
+    open_circuit(upstream)
+    time.sleep(0.25)
+
+    async def probe():
+        task = asyncio.create_task(upstream.call_async('test', asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(probe())
+    assert not upstream.breaker.probing
+    time.sleep(0.25)
+    assert upstream.call('test', lambda: 'ok') == 'ok'
+
+def test_server_errors_are_transient():
+    assert classify_spotify(spotipy.SpotifyException(503, -1, 'unavailable')) == (rate_governor.TRANSIENT, 0.0)
+    assert classify_spotify(spotipy.SpotifyException(429, -1, 'slow down', headers={'Retry-After': '3'})) == (
+        rate_governor.THROTTLED, 3.0
+    )
+
+def test_circuit_open_error_survives_pickling():
+    error = pickle.loads(pickle.dumps(CircuitOpenError('youtube', 12.0)))
+    assert (error.upstream, error.retry_in) == ('youtube', 12.0)
\ No newline at end of file
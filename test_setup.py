@@ -51,7 +51,6 @@ def test_python_dependencies():
         ('telegram', 'python-telegram-bot'),
         ('spotipy', 'spotipy'),
         ('yt_dlp', 'yt-dlp'),
-        ('youtubesearchpython', 'youtube-search-python'),
         ('mutagen', 'mutagen'),
         ('dotenv', 'python-dotenv'),
         ('requests', 'requests'),
@@ -140,12 +139,13 @@ def test_youtube_search():
     print("\n📺 Testing YouTube search...")
     
     try:
-        from youtubesearchpython import VideosSearch
+        import yt_dlp
         
-        search = VideosSearch("Queen Bohemian Rhapsody", limit=1)
-        results = search.result()
+        ydl_opts = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist'}
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            results = ydl.extract_info("ytsearch1:Queen Bohemian Rhapsody", download=False)
         
-        if results and results.get('result'):
+        if results and results.get('entries'):
             print("✅ YouTube search is working")
             return True
         else:
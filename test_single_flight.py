@@ -0,0 +1,31 @@
+import asyncio
+from single_flight import SingleFlight
+
+def test_concurrent_waiters_share_one_download_and_one_upload():
+    cleaned = []
+    flight = SingleFlight(cleanup=cleaned.append)
+    calls = {'download': 0, 'upload': 0, 'resend': 0}
+    file_ids = {}
+
+    async def download():
+        calls['download'] += 1
+        await asyncio.sleep(0.01)
+        return 'track.mp3'
+
+    async def request():
+        async with flight.lease('t1', download) as result, flight.exclusive('t1'):
+            if 't1' in file_ids:
+                calls['resend'] += 1
+                return
+            assert not cleaned
+            await asyncio.sleep(0.01)
+            calls['upload'] += 1
+            file_ids['t1'] = result
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(5)))
+
+    asyncio.run(main())
+    assert calls == {'download': 1, 'upload': 1, 'resend': 4}
+    assert cleaned == ['track.mp3']
+    assert not flight.is_inflight('t1')
\ No newline at end of file
@@ -2,24 +2,38 @@ import re
 import os
 import logging
 from urllib.parse import urlparse
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CONTAINER_OVERHEAD = 1.02
+TAG_OVERHEAD_BYTES = 512 * 1024
+SPOTIFY_CONTENT_TYPES = ('track', 'album', 'playlist')
+SPOTIFY_LINK_PATTERN = re.compile(
+    r'https?://(?:[\w-]+\.)*spotify\.com/(?:intl-[\w-]+/)?(?:track|album|playlist)/[A-Za-z0-9]+'
+    r'|spotify:(?:track|album|playlist):[A-Za-z0-9]+'
+    r'|https?://spotify\.link/[A-Za-z0-9]+'
+)
+
 def clean_title(title: str) -> str:
     return re.sub(r'[^\w\s\-\(\)\[\]]', '', title).strip()
 
 def extract_spotify_id(url: str) -> Optional[str]:
     try:
-        parsed = urlparse(url)
-        if 'spotify.com' not in parsed.netloc:
-            return None
-        path_parts = parsed.path.strip('/').split('/')
+        if url.startswith('spotify:'):
+            path_parts = url.split(':')[1:]
+        else:
+            parsed = urlparse(url)
+            if 'spotify.com' not in parsed.netloc:
+                return None
+            path_parts = parsed.path.strip('/').split('/')
+            if path_parts and path_parts[0].startswith('intl-'):
+                path_parts = path_parts[1:]
         if len(path_parts) >= 2:
             content_type = path_parts[0]
             content_id = path_parts[1].split('?')[0]
-            if content_type in ['track', 'album', 'playlist'] and content_id:
+            if content_type in SPOTIFY_CONTENT_TYPES and content_id:
                 return (content_type, content_id)
     except Exception as e:
         logger.error(f"Error extracting Spotify ID: {e}")
@@ -28,6 +42,23 @@ def extract_spotify_id(url: str) -> Optional[str]:
 def is_valid_spotify_url(url: str) -> bool:
     return extract_spotify_id(url) is not None
 
+def is_spotify_short_link(url: str) -> bool:
+    return urlparse(url).netloc == 'spotify.link'
+
+def make_spotify_url(content_type: str, content_id: str) -> str:
+    return f"https://open.spotify.com/{content_type}/{content_id}"
+
+def find_spotify_links(text: str) -> List[str]:
+    links = []
+    for match in SPOTIFY_LINK_PATTERN.findall(text):
+        if is_spotify_short_link(match):
+            links.append(match)
+            continue
+        spotify_id = extract_spotify_id(match)
+        if spotify_id:
+            links.append(make_spotify_url(*spotify_id))
+    return list(dict.fromkeys(links))
+
 def create_search_query(artist: str, title: str) -> str:
     clean_artist = clean_title(artist)
     clean_title_text = clean_title(title)
@@ -49,6 +80,10 @@ def format_file_size(size_bytes: int) -> str:
         i += 1
     return f"{size_bytes:.1f} {size_names[i]}"
 
+def estimate_audio_size(duration_ms: int, bitrate: str) -> int:
+    kbps = int(bitrate.rstrip('k'))
+    return int(duration_ms / 1000 * kbps * 125 * CONTAINER_OVERHEAD) + TAG_OVERHEAD_BYTES
+
 def sanitize_filename(filename: str) -> str:
     invalid_chars = '<>:"/\\|?*'
     for char in invalid_chars:
@@ -0,0 +1,78 @@
+import asyncio
+import itertools
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from config import WORKER_POOL_SIZE, WORKER_POOL_TYPE
+from utils import logger
+
+_process_downloader = None
+
+def _get_process_downloader():
+    global _process_downloader
+    if _process_downloader is None:
+        from spotify_downloader import SpotifyDownloader
+        _process_downloader = SpotifyDownloader()
+    return _process_downloader
+
+def _call_downloader(method_name: str, *args, **kwargs) -> Any:
+    return getattr(_get_process_downloader(), method_name)(*args, **kwargs)
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, future: Future, name: str):
+        self.id = next(Job._ids)
+        self.name = name
+        self.future = future
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self) -> bool:
+        return self.future.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self.future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.name}>"
+
+class WorkerPool:
+    def __init__(self, get_downloader: Optional[Callable[[], Any]] = None, size: int = WORKER_POOL_SIZE,
+                 kind: str = WORKER_POOL_TYPE):
+        self.get_downloader = get_downloader or _get_process_downloader
+        self.size = size
+        self.kind = kind
+        if kind == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=size)
+        elif kind == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='download')
+        else:
+            raise ValueError(f"Unknown worker pool type: {kind}")
+        logger.info(f"Started {kind} worker pool with {size} workers")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Job:
+        future = self.executor.submit(fn, *args, **kwargs)
+        return Job(future, getattr(fn, '__name__', repr(fn)))
+
+    def run_downloader(self, method_name: str, *args, **kwargs) -> Job:
+        if self.kind == 'process':
+            future = self.executor.submit(_call_downloader, method_name, *args, **kwargs)
+        else:
+            future = self.executor.submit(self._call_downloader, method_name, *args, **kwargs)
+        return Job(future, method_name)
+
+    def _call_downloader(self, method_name: str, *args, **kwargs) -> Any:
+        return getattr(self.get_downloader(), method_name)(*args, **kwargs)
+
+    def warm_up(self) -> List[Job]:
+        if self.kind != 'process':
+            return []
+        return [self.run_downloader('warm_up') for _ in range(self.size)]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info("Worker pool shut down")
\ No newline at end of file